@@ -0,0 +1,180 @@
+"""In-process stand-ins for the Discord objects the bot touches.
+
+Every REST-backed method sleeps for a configurable latency, and every Nth
+call can simulate a 429. Like discord.py, the fake logs the 429 on
+discord.http and then waits out retry_after, so the scheduler's
+rate-limit counter and the latency numbers both reflect it.
+"""
+import asyncio
+import itertools
+import logging
+import random
+from dataclasses import dataclass
+
+import discord
+
+from bot.services.role import _role_name
+from bot.config import RANKS
+
+_http_log = logging.getLogger("discord.http")
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.05  # seconds per REST call
+    jitter: float = 0.02
+    rate_limit_every: int = 0  # 0 disables simulated 429s
+    retry_after: float = 0.5
+
+
+class FakeRest:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.calls = 0
+        self.rate_limited = 0
+
+    async def call(self, route: str) -> None:
+        self.calls += 1
+        every = self.config.rate_limit_every
+        if every and self.calls % every == 0:
+            self.rate_limited += 1
+            _http_log.warning(
+                "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.",
+                "PATCH", route, self.config.retry_after,
+            )
+            await asyncio.sleep(self.config.retry_after)
+        await asyncio.sleep(max(0.0, self.config.latency + random.uniform(-1, 1) * self.config.jitter))
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+
+    def is_default(self) -> bool:
+        return self.name == "@everyone"
+
+    def __repr__(self) -> str:
+        return f"<FakeRole {self.name}>"
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", member_id: int, roles: list[FakeRole]):
+        self.guild = guild
+        self.id = member_id
+        self.roles = roles
+        self.mention = f"<@{member_id}>"
+        self.display_name = f"member-{member_id}"
+        self.dms = 0
+
+    # One request per role, like discord.py's atomic add_roles/remove_roles
+    async def add_roles(self, *roles: FakeRole, reason: str | None = None) -> None:
+        for role in roles:
+            await self.guild.rest.call(f"/guilds/{self.guild.id}/members/{self.id}/roles/{role.id}")
+            self.roles = self.roles + [role]
+
+    async def remove_roles(self, *roles: FakeRole, reason: str | None = None) -> None:
+        for role in roles:
+            await self.guild.rest.call(f"/guilds/{self.guild.id}/members/{self.id}/roles/{role.id}")
+            self.roles = [r for r in self.roles if r.id != role.id]
+
+    async def send(self, **kwargs) -> None:
+        await self.guild.rest.call(f"/users/{self.id}/messages")
+        self.dms += 1
+
+    def __str__(self) -> str:
+        return self.display_name
+
+
+class FakeChannel(discord.TextChannel):
+    """Passes the isinstance(channel, discord.TextChannel) check in role.py."""
+
+    # Doesn't call super().__init__, which needs a gateway connection
+    def __init__(self, guild: "FakeGuild", channel_id: int):
+        self.guild_ref = guild
+        self.id = channel_id
+        self.name = "git-eval-notifications"
+        self.messages = 0
+
+    async def send(self, **kwargs) -> None:
+        await self.guild_ref.rest.call(f"/channels/{self.id}/messages")
+        self.messages += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, channel_id: int, config: FakeConfig):
+        self.id = guild_id
+        self.name = "bench-guild"
+        self.unavailable = False
+        self.shard_id = 0
+        self.rest = FakeRest(config)
+        self.chunked = True
+        self._ids = itertools.count(10_000)
+        self.default_role = FakeRole(guild_id, "@everyone")
+        self.roles = [self.default_role] + [
+            FakeRole(next(self._ids), _role_name(rank)) for rank in RANKS
+        ]
+        self._members: dict[int, FakeMember] = {}
+        self._channel = FakeChannel(self, channel_id)
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    @property
+    def me(self):
+        return None
+
+    def add_member(self, member_id: int, rank: str = "G") -> FakeMember:
+        role = next(r for r in self.roles if r.name == _role_name(rank))
+        member = FakeMember(self, member_id, [self.default_role, role])
+        self._members[member_id] = member
+        return member
+
+    def get_member(self, member_id: int) -> FakeMember | None:
+        return self._members.get(member_id)
+
+    async def fetch_member(self, member_id: int) -> FakeMember:
+        await self.rest.call(f"/guilds/{self.id}/members/{member_id}")
+        member = self._members.get(member_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+    def get_role(self, role_id: int) -> FakeRole | None:
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    async def create_role(self, *, name: str, **kwargs) -> FakeRole:
+        await self.rest.call(f"/guilds/{self.id}/roles")
+        role = FakeRole(next(self._ids), name)
+        self.roles.append(role)
+        return role
+
+    def get_channel(self, channel_id: int):
+        return self._channel if channel_id == self._channel.id else None
+
+    async def chunk(self) -> None:
+        return None
+
+
+class _FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Not Found"
+
+
+class _FakeShard:
+    def is_closed(self) -> bool:
+        return False
+
+
+_OPEN_SHARD = _FakeShard()
+
+
+def install(guild: FakeGuild) -> None:
+    """Point bot.state.bot at the fake guild instead of a gateway connection."""
+    from bot.state import bot
+
+    bot.get_guild = lambda guild_id: guild if guild_id == guild.id else None
+    bot.is_ready = lambda: True
+    bot.get_shard = lambda shard_id: _OPEN_SHARD
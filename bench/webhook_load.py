@@ -0,0 +1,253 @@
+"""Offline load test for /webhook/eval against a stub Discord guild.
+
+Runs the real FastAPI app in-process (no sockets, no gateway) with a fresh
+data directory per scenario, sends correctly signed EvalResult payloads and
+reports throughput, latency percentiles and storage cost.
+
+    python -m bench.webhook_load --users 1000,10000 --concurrency 1,10,50
+    python -m bench.webhook_load --save bench/baselines/local.json
+    python -m bench.webhook_load --compare bench/baselines/local.json
+
+Settings from bot/config.py (STORAGE_BACKEND, WEBHOOK_ASYNC, ...) are read
+from the environment as usual.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# bot.config reads these at import time
+os.environ.setdefault("DISCORD_TOKEN", "bench")
+os.environ.setdefault("GUILD_ID", "1")
+os.environ.setdefault("WEBHOOK_SECRET", "bench-secret")
+os.environ.setdefault("NOTIFICATION_CHANNEL_ID", "2")
+# One client hammering a few users on purpose: measure processing, not the limits
+os.environ.setdefault("RATE_LIMIT_IP_PER_SECOND", "0")
+os.environ.setdefault("RATE_LIMIT_USER_PER_SECOND", "0")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="git-eval-bench-")
+
+
+def _dir_size(path: str) -> int:
+    """Bytes in all files below path (the stores nest per guild and per feedback bucket)."""
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+async def _post(app, path: str, body: bytes, headers: dict[str, str]) -> int:
+    """Drive one HTTP request through the ASGI app; returns the status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        + [(b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def _signed(secret: bytes, payload: dict) -> tuple[bytes, dict[str, str]]:
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    signature = hmac.new(secret, body, hashlib.sha256).hexdigest()
+    return body, {"Content-Type": "application/json", "X-Signature-256": f"sha256={signature}"}
+
+
+async def _scenario(users: int, concurrency: int, requests: int, fake_config) -> dict:
+    from bench import fake_discord
+    from bot.config import DATA_DIR, GUILD_ID, NOTIFICATION_CHANNEL_ID, WEBHOOK_SECRET
+    from bot.main import app
+    from bot.api.webhook import router
+    from bot.services import history, jobs, scheduler, score as score_service
+
+    if not any(getattr(r, "path", "").startswith("/webhook") for r in app.routes):
+        app.include_router(router)
+
+    guild = fake_discord.FakeGuild(GUILD_ID, NOTIFICATION_CHANNEL_ID, fake_config)
+    fake_discord.install(guild)
+
+    # Seed users that aren't registered yet (scenarios grow the same store),
+    # then give every registered user a member holding their stored rank role
+    existing = sum(1 for _ in score_service.iter_users(GUILD_ID))
+    for i in range(existing, users):
+        score_service.register_user(GUILD_ID, str(100_000 + i), f"bench-user-{i}")
+    for discord_id, user in score_service.iter_users(GUILD_ID):
+        guild.add_member(int(discord_id), user["rank"])
+    score_service.flush()
+
+    jobs.start()
+    scheduler.start()
+
+    secret = WEBHOOK_SECRET.encode()
+    rng = random.Random(users * 1000 + concurrency)
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for n in range(requests):
+        i = rng.randrange(users)
+        payload = {
+            "github_username": f"bench-user-{i}",
+            "score": rng.randrange(0, 101),
+            "feedback": "【CI/CD】\\n✅ テスト通過\\n" + "x" * rng.randrange(50, 500),
+            "rank": rng.choice([None, "G", "F", "E"]),
+        }
+        queue.put_nowait(_signed(secret, payload))
+
+    async def client():
+        while not queue.empty():
+            body, headers = queue.get_nowait()
+            started = time.perf_counter()
+            status = await _post(app, "/webhook/eval", body, headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    rest_before = guild.rest.calls
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    # Let background Discord work drain so the next scenario starts clean
+    await jobs.stop()
+    await scheduler.stop()
+
+    flush_started = time.perf_counter()
+    score_service.flush()
+    history.flush()
+    flush_seconds = time.perf_counter() - flush_started
+
+    latencies.sort()
+    return {
+        "users": users,
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "discord_calls": guild.rest.calls - rest_before,
+        "discord_429s": guild.rest.rate_limited,
+        "flush_ms": round(flush_seconds * 1000, 3),
+        "storage_bytes": _dir_size(DATA_DIR),
+    }
+
+
+def _compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["users"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get((r["users"], r["concurrency"]))
+        if not base:
+            continue
+        if r["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"users={r['users']} c={r['concurrency']}: throughput "
+                f"{r['throughput_rps']} < baseline {base['throughput_rps']}"
+            )
+        if r["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"users={r['users']} c={r['concurrency']}: p99 {r['p99_ms']}ms > baseline {base['p99_ms']}ms"
+            )
+    return regressions
+
+
+def main() -> int:
+    from bench.fake_discord import FakeConfig
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1000,10000", help="comma-separated registered user counts")
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated in-flight request counts")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="simulate a 429 every N REST calls")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    fake_config = FakeConfig(
+        latency=args.discord_latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+    )
+    user_counts = sorted(int(n) for n in args.users.split(","))
+    levels = [int(n) for n in args.concurrency.split(",")]
+
+    async def run() -> list[dict]:
+        results = []
+        for users in user_counts:
+            for concurrency in levels:
+                result = await _scenario(users, concurrency, args.requests, fake_config)
+                print(json.dumps(result, ensure_ascii=False))
+                results.append(result)
+        return results
+
+    results = asyncio.run(run())
+
+    from bot import config
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {
+            "storage_backend": config.STORAGE_BACKEND,
+            "webhook_async": config.WEBHOOK_ASYNC,
+            "discord_latency": args.discord_latency,
+            "rate_limit_every": args.rate_limit_every,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        regressions = _compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,24 @@
 import hashlib
 import hmac
+import json
 import logging
+import math
+import re
+import time
 
-import discord
 from fastapi import APIRouter, Request, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
 
-from bot.config import WEBHOOK_SECRET, GUILD_ID, RANKS
-from bot.services import score as score_service
-from bot.services.role import update_role, send_promotion_notification
+from bot.config import (
+    PROCESS_MODE, WEBHOOK_SECRET, WEBHOOK_ASYNC, WEBHOOK_MAX_BODY_BYTES, WEBHOOK_MAX_BATCH_BYTES,
+    EVAL_DEBOUNCE_SECONDS, EVAL_BATCH_MAX_ITEMS, DEDUP_HASH_FALLBACK, GUILD_IDS,
+    NOTIFICATION_CHANNEL_IDS, RATE_LIMIT_IP_PER_SECOND, RATE_LIMIT_IP_BURST,
+    RATE_LIMIT_USER_PER_SECOND, RATE_LIMIT_USER_BURST,
+)
+from bot.services import debounce, dedup, jobs, metrics, store, tracing
+from bot.services.effects import DEFERRED, apply_eval_effects
+from bot.services.ratelimit import RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -20,116 +30,252 @@ class EvalResult(BaseModel):
     score: int
     feedback: str
     rank: str | None = None
+    # Target guild; defaults to the X-Guild-Id header, then to the one guild
+    # the username is registered in
+    guild_id: int | None = None
 
 
-def _verify_signature(body: bytes, signature: str) -> bool:
-    expected = hmac.new(
-        WEBHOOK_SECRET.encode(), body, hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(f"sha256={expected}", signature)
+_SIGNATURE_RE = re.compile(r"sha256=[0-9a-f]{64}")
+
+_ip_limiter = RateLimiter(RATE_LIMIT_IP_PER_SECOND, RATE_LIMIT_IP_BURST)
+_user_limiter = RateLimiter(RATE_LIMIT_USER_PER_SECOND, RATE_LIMIT_USER_BURST)
+
+
+def _check_rate(limiter: RateLimiter, key: str, limit: str) -> None:
+    """Raise 429 with Retry-After if key has no token left."""
+    wait = limiter.take(key)
+    if wait:
+        metrics.WEBHOOK_RATE_LIMITED.inc(limit=limit)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded ({limit})",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def _client_ip(request: Request) -> str:
+    # uvicorn already resolves X-Forwarded-For from trusted proxies
+    return request.client.host if request.client else "unknown"
+
+
+async def _read_verified_body(request: Request, max_bytes: int) -> bytes:
+    """Read the body while computing its HMAC, rejecting bad requests early.
+
+    Missing/malformed signatures are refused before reading, oversized
+    bodies as soon as Content-Length or the streamed size exceeds max_bytes.
+    """
+    signature = request.headers.get("X-Signature-256", "")
+    if not _SIGNATURE_RE.fullmatch(signature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    length = request.headers.get("Content-Length")
+    if length is not None and (not length.isdigit() or int(length) > max_bytes):
+        raise HTTPException(status_code=413, detail=f"Body exceeds {max_bytes} bytes")
+
+    mac = hmac.new(WEBHOOK_SECRET.encode(), digestmod=hashlib.sha256)
+    chunks: list[bytes] = []
+    size = 0
+    hashing = 0.0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {max_bytes} bytes")
+        started = time.perf_counter()
+        mac.update(chunk)
+        hashing += time.perf_counter() - started
+        chunks.append(chunk)
+
+    started = time.perf_counter()
+    valid = hmac.compare_digest(f"sha256={mac.hexdigest()}", signature)
+    metrics.SIGNATURE_LATENCY.observe(hashing + time.perf_counter() - started)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    return b"".join(chunks)
 
 
 @router.get("/debug")
 async def debug_status():
     """Check bot connectivity — for debugging only."""
     from bot.state import bot
-    from bot.config import NOTIFICATION_CHANNEL_ID
 
     info = {
         "bot_ready": bot.is_ready(),
         "bot_user": str(bot.user) if bot.user else None,
-        "guild_id": GUILD_ID,
-        "notification_channel_id": NOTIFICATION_CHANNEL_ID,
+        "shard_count": bot.shard_count,
+        "guilds": [],
     }
 
-    guild = bot.get_guild(GUILD_ID)
-    if guild:
-        info["guild_name"] = guild.name
-        info["guild_member_count"] = guild.member_count
-        info["bot_permissions"] = dict(guild.me.guild_permissions) if guild.me else "bot not in guild"
-        channel = guild.get_channel(NOTIFICATION_CHANNEL_ID) if NOTIFICATION_CHANNEL_ID else None
-        info["notification_channel"] = channel.name if channel else "NOT FOUND"
-        info["roles"] = [r.name for r in guild.roles if r.name.startswith("Git-Eval")]
-    else:
-        info["guild"] = "NOT FOUND"
+    for guild_id in GUILD_IDS:
+        channel_id = NOTIFICATION_CHANNEL_IDS.get(guild_id, 0)
+        entry = {"guild_id": guild_id, "notification_channel_id": channel_id}
+        guild = bot.get_guild(guild_id)
+        if guild:
+            entry["guild_name"] = guild.name
+            entry["shard_id"] = guild.shard_id
+            entry["guild_member_count"] = guild.member_count
+            entry["bot_permissions"] = dict(guild.me.guild_permissions) if guild.me else "bot not in guild"
+            channel = guild.get_channel(channel_id) if channel_id else None
+            entry["notification_channel"] = channel.name if channel else "NOT FOUND"
+            entry["roles"] = [r.name for r in guild.roles if r.name.startswith("Git-Eval")]
+        else:
+            entry["guild"] = "NOT FOUND"
+        info["guilds"].append(entry)
 
     return info
 
 
+def _header_guild(request: Request) -> int | None:
+    value = request.headers.get("X-Guild-Id")
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid X-Guild-Id")
+    return int(value)
+
+
+def _route_error(guild_id: int | None, matches: list) -> str | None:
+    """Why an evaluation can't be routed to exactly one guild, or None if it can."""
+    if guild_id is not None and guild_id not in GUILD_IDS:
+        return "unknown_guild"
+    if not matches:
+        return "not_registered"
+    if len(matches) > 1:
+        return "ambiguous_guild"
+    return None
+
+
+_ROUTE_ERRORS = {
+    "unknown_guild": (404, "Guild not served by this deployment"),
+    "not_registered": (404, "User not registered"),
+    "ambiguous_guild": (409, "User is registered in several guilds; set guild_id"),
+}
+
+
+def _delivery_key(request: Request, body: bytes) -> str | None:
+    delivery_id = request.headers.get("X-Delivery-Id")
+    if delivery_id:
+        return f"id:{delivery_id}"
+    if DEDUP_HASH_FALLBACK:
+        return f"sha256:{hashlib.sha256(body).hexdigest()}"
+    return None
+
+
+def _response(status: int, content: dict, replayed: bool = False) -> JSONResponse:
+    headers = {}
+    if "job_id" in content:
+        headers["Location"] = f"{router.prefix}/jobs/{content['job_id']}"
+    if replayed:
+        headers["X-Delivery-Replayed"] = "true"
+    return JSONResponse(status_code=status, content=content, headers=headers)
+
+
 @router.post("/eval")
 async def receive_eval(request: Request):
+    # Flood protection comes first; it doesn't even need the body
+    _check_rate(_ip_limiter, _client_ip(request), "ip")
+
     # Signature verification
-    signature = request.headers.get("X-Signature-256", "")
-    body = await request.body()
-    if not _verify_signature(body, signature):
-        raise HTTPException(status_code=401, detail="Invalid signature")
+    with tracing.span("webhook.verify"):
+        body = await _read_verified_body(request, WEBHOOK_MAX_BODY_BYTES)
+
+    # Retries and re-runs of the same delivery replay the first response
+    key = _delivery_key(request, body)
+    if key is None:
+        return _response(*await _process_eval(request, body))
+    (status, content), replayed = await dedup.run_once(
+        key, lambda: _process_eval(request, body, key), record=_settled
+    )
+    return _response(status, content, replayed)
 
-    payload = EvalResult.model_validate_json(body)
 
-    # Find user by GitHub username
-    result = score_service.find_by_github(payload.github_username)
-    if not result:
-        raise HTTPException(status_code=404, detail="User not registered")
+def _settled(response: tuple[int, dict]) -> bool:
+    # A pending debounce window records its final response itself (see debounce)
+    return response[1].get("status") != "pending"
 
-    discord_id, user_data = result
 
-    old_rank, new_rank, new_score = score_service.add_score(
-        discord_id, payload.score, eval_rank=payload.rank
+async def _process_eval(
+    request: Request, body: bytes, delivery_key: str | None = None
+) -> tuple[int, dict]:
+    # The verified bytes are parsed exactly once
+    try:
+        payload = EvalResult.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(include_url=False, include_context=False, include_input=False),
+        )
+    # A looping sender for one user; only verified bodies count against the user
+    _check_rate(_user_limiter, payload.github_username.lower(), "user")
+
+    # Accept-and-enqueue: persist the score now, do Discord work in the background
+    # (always when the gateway runs in a separate process)
+    run_async = (
+        WEBHOOK_ASYNC or PROCESS_MODE == "api" or request.headers.get("Prefer") == "respond-async"
     )
+    if run_async and await jobs.is_full():
+        raise HTTPException(status_code=503, detail="Job queue full", headers={"Retry-After": "5"})
 
-    # Update Discord role and send notification if promoted
-    from bot.state import bot
+    # Find the guild and member by GitHub username
+    guild_id = payload.guild_id or _header_guild(request)
+    matches = []
+    if guild_id is None or guild_id in GUILD_IDS:
+        with tracing.span("webhook.route"):
+            [matches] = await store.locate_many([(payload.github_username, guild_id)])
+    error = _route_error(guild_id, matches)
+    if error:
+        status, detail = _ROUTE_ERRORS[error]
+        raise HTTPException(status_code=status, detail=detail)
 
-    guild = bot.get_guild(GUILD_ID)
-    promoted = False
-    discord_error = None
+    guild_id, discord_id, user_data = matches[0]
 
-    try:
-        if not guild:
-            discord_error = f"Guild {GUILD_ID} not found. bot.guilds={[g.id for g in bot.guilds]}"
-            logger.warning(discord_error)
-        else:
-            # get_member uses cache only; fall back to API fetch
-            member = guild.get_member(int(discord_id))
-            if not member:
-                try:
-                    member = await guild.fetch_member(int(discord_id))
-                except discord.NotFound:
-                    member = None
-
-            if not member:
-                discord_error = f"Member {discord_id} not found in guild {guild.name}"
-                logger.warning(discord_error)
-            else:
-                promoted = await update_role(guild, member, old_rank, new_rank)
-                if promoted:
-                    await send_promotion_notification(guild, member, new_rank)
-
-                # Send DM with feedback
-                try:
-                    embed_title = "評価結果"
-                    if promoted:
-                        embed_title += f" (昇格: {old_rank} → {new_rank}!)"
-
-                    feedback_text = payload.feedback.replace("\\n", "\n")
-                    embed = discord.Embed(
-                        title=embed_title,
-                        description=(
-                            f"**スコア:** +{payload.score} pt (累積: {new_score} pt)\n"
-                            f"**ランク:** {new_rank}\n\n"
-                            f"**フィードバック:**\n{feedback_text}"
-                        ),
-                        color=discord.Color.green() if promoted else discord.Color.blue(),
-                    )
-                    await member.send(embed=embed)
-                except discord.Forbidden:
-                    logger.info("DM blocked by %s", member)
-    except Exception as e:
-        discord_error = f"{type(e).__name__}: {e}"
-        logger.error("Discord operation failed: %s", discord_error)
-
-    return {
+    if debounce.enabled():
+        pending = debounce.submit(
+            guild_id, discord_id, payload.github_username, payload.score, payload.feedback,
+            payload.rank, delivery_key,
+        )
+        return 202, {
+            "status": "pending",
+            "guild_id": guild_id,
+            "discord_id": discord_id,
+            "coalesced": pending.count,
+            "apply_in": EVAL_DEBOUNCE_SECONDS,
+        }
+
+    old_rank, new_rank, new_score = await store.add_score(
+        guild_id, discord_id, payload.score, eval_rank=payload.rank, feedback=payload.feedback
+    )
+
+    if run_async:
+        job = await jobs.submit(
+            guild_id, discord_id, old_rank, new_rank, new_score, payload.score, payload.feedback
+        )
+        return 202, {
+            "status": "accepted",
+            "job_id": job.id,
+            "guild_id": guild_id,
+            "discord_id": discord_id,
+            "old_rank": old_rank,
+            "new_rank": new_rank,
+            "score": new_score,
+        }
+
+    promoted, discord_error = await apply_eval_effects(
+        guild_id, discord_id, old_rank, new_rank, new_score, payload.score, payload.feedback
+    )
+    if discord_error == DEFERRED:
+        # Score saved; role/DM run once the gateway is back
+        return 202, {
+            "status": "deferred",
+            "guild_id": guild_id,
+            "discord_id": discord_id,
+            "old_rank": old_rank,
+            "new_rank": new_rank,
+            "score": new_score,
+        }
+
+    return 200, {
         "status": "ok",
+        "guild_id": guild_id,
         "discord_id": discord_id,
         "old_rank": old_rank,
         "new_rank": new_rank,
@@ -137,3 +283,123 @@ async def receive_eval(request: Request):
         "promoted": promoted,
         "discord_error": discord_error,
     }
+
+
+def _parse_batch(body: bytes) -> list:
+    """Accept a JSON array or one JSON object per line (JSONL)."""
+    text = body.decode("utf-8").strip()
+    if text.startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array")
+        return items
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+@router.post("/eval/batch")
+async def receive_eval_batch(request: Request):
+    _check_rate(_ip_limiter, _client_ip(request), "ip")
+    with tracing.span("webhook.verify"):
+        body = await _read_verified_body(request, WEBHOOK_MAX_BATCH_BYTES)
+
+    key = _delivery_key(request, body)
+    if key is None:
+        return _response(*await _process_eval_batch(request, body))
+    (status, content), replayed = await dedup.run_once(
+        key, lambda: _process_eval_batch(request, body)
+    )
+    return _response(status, content, replayed)
+
+
+async def _process_eval_batch(request: Request, body: bytes) -> tuple[int, dict]:
+    try:
+        raw_items = _parse_batch(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch: {e}")
+    if len(raw_items) > EVAL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {EVAL_BATCH_MAX_ITEMS} items")
+
+    results: list[dict] = []
+    payloads: dict[int, EvalResult] = {}
+    for i, raw in enumerate(raw_items):
+        try:
+            payloads[i] = EvalResult.model_validate(raw)
+            results.append({"index": i, "github_username": payloads[i].github_username})
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            results.append({"index": i, "status": "invalid", "errors": errors})
+
+    # Evaluations over a user's limit are reported per item, the rest proceed
+    for i in list(payloads):
+        wait = _user_limiter.take(payloads[i].github_username.lower())
+        if wait:
+            del payloads[i]
+            metrics.WEBHOOK_RATE_LIMITED.inc(limit="user")
+            results[i].update(status="rate_limited", retry_after=math.ceil(wait))
+
+    # Resolve users, then apply each guild's score changes in one store transaction
+    default_guild = _header_guild(request)
+    targets = {i: p.guild_id or default_guild for i, p in payloads.items()}
+    lookups = [i for i in payloads if targets[i] is None or targets[i] in GUILD_IDS]
+    found = await store.locate_many(
+        [(payloads[i].github_username, targets[i]) for i in lookups]
+    )
+    matches = dict(zip(lookups, found))
+    by_guild: dict[int, list[tuple[int, str]]] = {}
+    for i in payloads:
+        error = _route_error(targets[i], matches.get(i, []))
+        if error:
+            results[i]["status"] = error
+            continue
+        guild_id, discord_id, _ = matches[i][0]
+        by_guild.setdefault(guild_id, []).append((i, discord_id))
+
+    applied: list[tuple[int, int, str, tuple[str, str, int]]] = []
+    for guild_id, to_apply in by_guild.items():
+        changes = await store.add_scores(
+            guild_id,
+            [
+                (discord_id, payloads[i].score, payloads[i].rank, payloads[i].feedback)
+                for i, discord_id in to_apply
+            ],
+        )
+        applied += [
+            (guild_id, i, discord_id, change) for (i, discord_id), change in zip(to_apply, changes)
+        ]
+
+    # One role update and one DM per member, handled by the job workers
+    members: dict[tuple[int, str], dict] = {}
+    for guild_id, i, discord_id, (old_rank, new_rank, new_score) in applied:
+        results[i].update(
+            status="ok", guild_id=guild_id, discord_id=discord_id,
+            old_rank=old_rank, new_rank=new_rank, score=new_score,
+        )
+        group = members.setdefault(
+            (guild_id, discord_id), {"old_rank": old_rank, "points": 0, "feedback": [], "items": []}
+        )
+        group["new_rank"], group["score"] = new_rank, new_score
+        group["points"] += payloads[i].score
+        group["feedback"].append(payloads[i].feedback)
+        group["items"].append(i)
+    for (guild_id, discord_id), group in members.items():
+        job = await jobs.submit(
+            guild_id, discord_id, group["old_rank"], group["new_rank"], group["score"],
+            group["points"], "\n\n---\n\n".join(group["feedback"]),
+        )
+        for i in group["items"]:
+            results[i]["job_id"] = job.id
+
+    return 200, {
+        "status": "ok",
+        "applied": len(applied),
+        "members": len(members),
+        "results": results,
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
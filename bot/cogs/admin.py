@@ -0,0 +1,72 @@
+import asyncio
+from typing import Literal
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.services import profiler
+from bot.services.reconcile import reconcile_roles, rerank_guild
+
+
+class Admin(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="reconcile", description="登録ユーザーのランクロールをスコアに合わせて修正します")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def reconcile(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        counts = await reconcile_roles(interaction.guild)
+        await interaction.followup.send(
+            f"ロール同期完了 ({counts['seconds']}s)\n"
+            f"登録: {counts['users']} / 一致: {counts['in_sync']} / 修正: {counts['updated']} / "
+            f"未参加: {counts['missing']} / 失敗: {counts['failed']}",
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="rerank", description="現在のランク基準で全ユーザーのランクを再計算します")
+    @app_commands.describe(dry_run="変更件数だけを表示し、保存・ロール変更は行わない")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def rerank(self, interaction: discord.Interaction, dry_run: bool = False):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        counts = await rerank_guild(interaction.guild, dry_run=dry_run)
+        header = "ランク再計算 (dry run)" if dry_run else "ランク再計算完了"
+        lines = [
+            f"{header} ({counts['seconds']}s)",
+            f"変更: {counts['changed']} (昇格: {counts['promoted']} / 降格: {counts['demoted']})",
+        ]
+        if not dry_run:
+            lines.append(
+                f"ロール更新: {counts['updated']} / 未参加: {counts['missing']} / 失敗: {counts['failed']}"
+            )
+        await interaction.followup.send("\n".join(lines), ephemeral=True)
+
+    @app_commands.command(name="profiler", description="サンプリングプロファイラを開始・停止します")
+    @app_commands.describe(action="start: 開始 / stop: 停止して保存 / status: 途中経過")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def profiler(self, interaction: discord.Interaction, action: Literal["start", "stop", "status"]):
+        # Profiles this process only; in split mode API workers take SIGUSR2 instead
+        if action == "start":
+            started = profiler.start()
+            message = "プロファイラを開始しました。" if started else "プロファイラは既に実行中です。"
+        else:
+            stats = profiler.stats()
+            top = profiler.top(10)
+            path = await asyncio.to_thread(profiler.stop) if action == "stop" else None
+            if not stats["samples"] and not stats["running"]:
+                message = "プロファイラは停止しています。"
+            else:
+                lines = [f"サンプル数: {stats['samples']}"]
+                lines += [f"`{count:>6}` {name}" for name, count in top]
+                if path:
+                    lines.append(f"保存先: `{path}`")
+                message = "\n".join(lines)
+        await interaction.response.send_message(message, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Admin(bot))
@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.services import store
+
+# Room for a page in an embed description (4096 max)
+_PAGE_CHARS = 4000
+
+
+def _paginate(text: str) -> list[str]:
+    """Split text into pages at line breaks, hard-splitting overlong lines."""
+    pages, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > _PAGE_CHARS:
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(line[:_PAGE_CHARS])
+            line = line[_PAGE_CHARS:]
+        if len(current) + len(line) > _PAGE_CHARS:
+            pages.append(current)
+            current = ""
+        current += line
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+
+class FeedbackView(discord.ui.View):
+    def __init__(self, title: str, footer: str, pages: list[str], timestamp: datetime):
+        super().__init__(timeout=300)
+        self.title = title
+        self.footer = footer
+        self.timestamp = timestamp
+        self.pages = pages
+        self.page = 0
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev.disabled = self.page <= 0
+        self.next.disabled = self.page >= len(self.pages) - 1
+
+    def embed(self) -> discord.Embed:
+        embed = discord.Embed(
+            title=self.title,
+            description=self.pages[self.page],
+            color=discord.Color.blue(),
+            timestamp=self.timestamp,
+        )
+        embed.set_footer(text=f"{self.footer} · {self.page + 1} / {len(self.pages)} ページ")
+        return embed
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = min(max(page, 0), len(self.pages) - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
+class Feedback(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="feedback", description="評価のフィードバック全文を表示します")
+    @app_commands.describe(
+        member="表示するメンバー (省略時は自分、他のメンバーは管理者のみ)",
+        evaluation="何件前の評価か (1 = 最新)",
+    )
+    async def feedback(
+        self,
+        interaction: discord.Interaction,
+        member: discord.Member | None = None,
+        evaluation: app_commands.Range[int, 1] = 1,
+    ):
+        target = member or interaction.user
+        perms = interaction.permissions
+        if target.id != interaction.user.id and not (perms.administrator or perms.manage_guild):
+            await interaction.response.send_message(
+                "他のメンバーのフィードバックは管理者のみ閲覧できます。", ephemeral=True
+            )
+            return
+
+        event, total = await store.feedback_event(interaction.guild_id, str(target.id), evaluation)
+
+        if not event:
+            message = "フィードバックがありません。" if not total else f"フィードバックは {total} 件までです。"
+            await interaction.response.send_message(message, ephemeral=True)
+            return
+
+        text = await store.history_feedback(interaction.guild_id, event)
+        if text is None:
+            await interaction.response.send_message(
+                "このフィードバックは保存期間を過ぎたため削除されました。", ephemeral=True
+            )
+            return
+
+        view = FeedbackView(
+            title=f"{target.display_name} のフィードバック",
+            footer=f"評価 {evaluation} / {total} (+{event.points} pt)",
+            pages=_paginate(text.replace("\\n", "\n")),
+            timestamp=datetime.fromtimestamp(event.timestamp, timezone.utc),
+        )
+        await interaction.response.send_message(embed=view.embed(), view=view, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Feedback(bot))
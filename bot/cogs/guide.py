@@ -2,7 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from bot.services import score as score_service
+from bot.services import store
 from bot.config import RANK_NAMES, TEMPLATE_REPO_URL
 
 GUIDE_TEXTS: dict[str, str] = {
@@ -124,7 +124,7 @@ class Guide(commands.Cog):
     @app_commands.command(name="guide", description="現在ランクの評価基準・即アウト条件を表示します")
     async def guide(self, interaction: discord.Interaction):
         discord_id = str(interaction.user.id)
-        user = score_service.get_user(discord_id)
+        user = await store.get_user(interaction.guild_id, discord_id)
 
         if not user:
             await interaction.response.send_message(
@@ -0,0 +1,76 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.services import store
+from bot.config import HISTORY_PAGE_SIZE
+
+_SPARKS = "▁▂▃▄▅▆▇█"
+
+
+def _sparkline(values: list[int]) -> str:
+    low, high = min(values), max(values)
+    span = high - low or 1
+    return "".join(_SPARKS[(v - low) * (len(_SPARKS) - 1) // span] for v in values)
+
+
+class History(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="history", description="直近の評価履歴とスコア推移を表示します")
+    @app_commands.describe(member="表示するメンバー (省略時は自分)")
+    async def history(self, interaction: discord.Interaction, member: discord.Member | None = None):
+        target = member or interaction.user
+        events = await store.history(interaction.guild_id, str(target.id), HISTORY_PAGE_SIZE)
+
+        if not events:
+            await interaction.response.send_message("評価履歴がありません。", ephemeral=True)
+            return
+
+        lines = []
+        for e in events:
+            when = f"<t:{int(e.timestamp)}:d>"
+            if e.reset:
+                lines.append(f"{when} 登録 (スコアリセット)")
+                continue
+            if e.rerank:
+                lines.append(f"{when} ランク基準の変更 ({e.old_rank} → {e.new_rank})")
+                continue
+            line = f"{when} **+{e.points}** pt → {e.score} pt"
+            if e.old_rank != e.new_rank:
+                line += f" ({e.old_rank} → {e.new_rank})"
+            if e.skip_grade:
+                line += " ⏩ 飛び級"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title=f"{target.display_name} の評価履歴",
+            description="\n".join(lines),
+            color=discord.Color.blue(),
+        )
+        scores = [e.score for e in reversed(events)]
+        if len(scores) > 1:
+            embed.add_field(
+                name="スコア推移",
+                value=f"`{_sparkline(scores)}` {scores[0]} → {scores[-1]} pt",
+                inline=False,
+            )
+        # Feedback is private: only its owner and server managers see it
+        perms = interaction.permissions
+        can_see_feedback = target.id == interaction.user.id or perms.administrator or perms.manage_guild
+        latest = next((e for e in events if e.feedback_length), None) if can_see_feedback else None
+        if latest:
+            feedback = await store.history_feedback(interaction.guild_id, latest)
+            if feedback is None:
+                feedback = "(保存期間を過ぎたため削除されました)"
+            feedback = feedback.replace("\\n", "\n")
+            if len(feedback) > 1024:
+                feedback = feedback[:1000] + "...\n(全文は `/feedback`)"
+            embed.add_field(name="最新のフィードバック", value=feedback, inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(History(bot))
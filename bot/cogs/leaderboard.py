@@ -0,0 +1,90 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.services import store
+from bot.config import RANK_NAMES, RANKS, LEADERBOARD_PAGE_SIZE
+
+
+async def _leaderboard_embed(guild_id: int, discord_id: str, page: int) -> tuple[discord.Embed, int]:
+    """Build one page (0-based) of the guild's leaderboard; returns (embed, page count)."""
+    position, total = await store.leaderboard_position(guild_id, discord_id)
+    pages = max(1, -(-total // LEADERBOARD_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    rows = await store.leaderboard(guild_id, page * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+
+    lines = [
+        f"`#{pos}` <@{did}> — **{rank}** {score} pt"
+        for pos, did, score, rank in rows
+    ]
+    embed = discord.Embed(
+        title="リーダーボード",
+        description="\n".join(lines) or "まだ登録者がいません。",
+        color=discord.Color.gold(),
+    )
+    if position:
+        embed.add_field(name="あなたの順位", value=f"**{position}** 位 / {total} 人", inline=False)
+    embed.set_footer(text=f"{page + 1} / {pages} ページ")
+    return embed, pages
+
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, guild_id: int, discord_id: str, page: int, pages: int):
+        super().__init__(timeout=120)
+        self.guild_id = guild_id
+        self.discord_id = discord_id
+        self.page = page
+        self.pages = pages
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev.disabled = self.page <= 0
+        self.next.disabled = self.page >= self.pages - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        embed, self.pages = await _leaderboard_embed(self.guild_id, self.discord_id, page)
+        self.page = min(max(page, 0), self.pages - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="leaderboard", description="累積スコアのランキングを表示します")
+    @app_commands.describe(page="ページ番号")
+    async def leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1] = 1):
+        discord_id = str(interaction.user.id)
+        embed, pages = await _leaderboard_embed(interaction.guild_id, discord_id, page - 1)
+        view = LeaderboardView(interaction.guild_id, discord_id, min(page - 1, pages - 1), pages)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    @app_commands.command(name="ranks", description="ランクごとの人数を表示します")
+    async def ranks(self, interaction: discord.Interaction):
+        counts = await store.rank_distribution(interaction.guild_id)
+        total = sum(counts.values())
+        lines = []
+        for rank in reversed(RANKS):
+            count = counts.get(rank, 0)
+            share = count / total if total else 0
+            lines.append(f"**{rank}** ({RANK_NAMES[rank]}): {count} 人 ({share:.0%})")
+        embed = discord.Embed(
+            title="ランク分布",
+            description="\n".join(lines),
+            color=discord.Color.purple(),
+        )
+        embed.set_footer(text=f"合計 {total} 人")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Leaderboard(bot))
@@ -2,8 +2,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from bot.services import score as score_service
-from bot.services.role import update_role, _role_name
+from bot.services import store
+from bot.services.scheduler import set_rank_role
 from bot.config import RANK_NAMES, TEMPLATE_REPO_URL
 
 
@@ -15,7 +15,7 @@ class Register(commands.Cog):
     @app_commands.describe(github_username="GitHub ユーザー名")
     async def register(self, interaction: discord.Interaction, github_username: str):
         discord_id = str(interaction.user.id)
-        existing = score_service.get_user(discord_id)
+        existing = await store.get_user(interaction.guild_id, discord_id)
 
         if existing:
             # Confirm overwrite
@@ -29,17 +29,15 @@ class Register(commands.Cog):
             )
             return
 
-        user_data = score_service.register_user(discord_id, github_username)
+        # Acknowledge within Discord's 3s window; the role edit can be slow under rate limits
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        user_data = await store.register_user(interaction.guild_id, discord_id, github_username)
         rank = user_data["rank"]
 
         # Assign initial role
         guild = interaction.guild
         if guild:
-            role_name = _role_name(rank)
-            role = discord.utils.get(guild.roles, name=role_name)
-            if not role:
-                role = await guild.create_role(name=role_name)
-            await interaction.user.add_roles(role)
+            await set_rank_role(guild, interaction.user, rank)
 
         rank_label = f"{rank} ({RANK_NAMES[rank]})"
         embed = discord.Embed(
@@ -54,7 +52,7 @@ class Register(commands.Cog):
             ),
             color=discord.Color.green(),
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 class ConfirmOverwrite(discord.ui.View):
@@ -65,23 +63,19 @@ class ConfirmOverwrite(discord.ui.View):
 
     @discord.ui.button(label="上書きする", style=discord.ButtonStyle.danger)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_data = score_service.register_user(self.discord_id, self.github_username)
+        await interaction.response.defer()
+        user_data = await store.register_user(
+            interaction.guild_id, self.discord_id, self.github_username
+        )
         rank = user_data["rank"]
 
         guild = interaction.guild
         if guild:
-            # Remove all old rank roles, add new one
-            for r in interaction.user.roles:
-                if r.name.startswith("Git-Eval:"):
-                    await interaction.user.remove_roles(r)
-            role_name = _role_name(rank)
-            role = discord.utils.get(guild.roles, name=role_name)
-            if not role:
-                role = await guild.create_role(name=role_name)
-            await interaction.user.add_roles(role)
+            # Replaces any old rank roles in one edit
+            await set_rank_role(guild, interaction.user, rank)
 
         rank_label = f"{rank} ({RANK_NAMES[rank]})"
-        await interaction.response.edit_message(
+        await interaction.edit_original_response(
             content=f"上書き完了: GitHub `{self.github_username}` / ランク **{rank_label}** / スコア 0",
             view=None,
         )
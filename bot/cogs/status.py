@@ -3,6 +3,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from bot.services import score as score_service
+from bot.services import store
 from bot.config import RANK_NAMES, RANK_THRESHOLDS, RANKS
 
 
@@ -13,7 +14,7 @@ class Status(commands.Cog):
     @app_commands.command(name="status", description="現在のランク・累積スコアを確認します")
     async def status(self, interaction: discord.Interaction):
         discord_id = str(interaction.user.id)
-        user = score_service.get_user(discord_id)
+        user = await store.get_user(interaction.guild_id, discord_id)
 
         if not user:
             await interaction.response.send_message(
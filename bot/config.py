@@ -4,13 +4,138 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DISCORD_TOKEN: str = os.environ["DISCORD_TOKEN"]
-GUILD_ID: int = int(os.environ["GUILD_ID"])
+
+# Guilds served by this process, comma-separated (a single GUILD_ID still works).
+# The first is the default guild, whose data stays directly under DATA_DIR so
+# existing single-guild deployments keep their files.
+GUILD_IDS: list[int] = [
+    int(g) for g in (os.environ.get("GUILD_IDS") or os.environ["GUILD_ID"]).split(",") if g.strip()
+]
+GUILD_ID: int = GUILD_IDS[0]
+
+# Gateway shards for the auto-sharded client (0 = use Discord's recommendation)
+SHARD_COUNT: int = int(os.environ.get("SHARD_COUNT", "0"))
+
 WEBHOOK_SECRET: str = os.environ["WEBHOOK_SECRET"]
 
+# "all" runs the webhook API and the gateway in one process. "api" runs
+# API_WORKERS stateless webhook workers that persist scores and publish
+# Discord work to a durable outbox; "gateway" connects to Discord and
+# consumes that outbox. Split modes need STORAGE_BACKEND=sqlite.
+PROCESS_MODE: str = os.environ.get("PROCESS_MODE", "all")
+API_HOST: str = os.environ.get("API_HOST", "0.0.0.0")
+API_PORT: int = int(os.environ.get("API_PORT", "8000"))
+API_WORKERS: int = int(os.environ.get("API_WORKERS", "1"))
+# /health and /metrics of the gateway process in split mode
+GATEWAY_PORT: int = int(os.environ.get("GATEWAY_PORT", "8001"))
+# Seconds the gateway waits before polling an empty outbox again
+OUTBOX_POLL_INTERVAL: float = float(os.environ.get("OUTBOX_POLL_INTERVAL", "0.5"))
+# Unfinished outbox jobs beyond which API workers answer 503
+OUTBOX_MAX_PENDING: int = int(os.environ.get("OUTBOX_MAX_PENDING", "100000"))
+
+# Largest request bodies accepted by /webhook/eval and /webhook/eval/batch
+WEBHOOK_MAX_BODY_BYTES: int = int(os.environ.get("WEBHOOK_MAX_BODY_BYTES", str(256 * 1024)))
+WEBHOOK_MAX_BATCH_BYTES: int = int(os.environ.get("WEBHOOK_MAX_BATCH_BYTES", str(16 * 1024 * 1024)))
+
+# Token-bucket limits on /webhook/eval and /webhook/eval/batch, checked
+# before any store or Discord work: sustained requests per second and burst
+# per client IP (checked before the body is read) and evaluations per GitHub
+# username. A rate of 0 disables that limit. Excess requests get 429.
+RATE_LIMIT_IP_PER_SECOND: float = float(os.environ.get("RATE_LIMIT_IP_PER_SECOND", "20"))
+RATE_LIMIT_IP_BURST: int = int(os.environ.get("RATE_LIMIT_IP_BURST", "100"))
+RATE_LIMIT_USER_PER_SECOND: float = float(os.environ.get("RATE_LIMIT_USER_PER_SECOND", "0.2"))
+RATE_LIMIT_USER_BURST: int = int(os.environ.get("RATE_LIMIT_USER_BURST", "10"))
+# Buckets remembered per limit (least recently used are dropped first)
+RATE_LIMIT_MAX_KEYS: int = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Respond 202 and run Discord side effects in background workers.
+# Senders can also opt in per request with "Prefer: respond-async".
+WEBHOOK_ASYNC: bool = os.environ.get("WEBHOOK_ASYNC", "0") == "1"
+EVAL_JOB_WORKERS: int = int(os.environ.get("EVAL_JOB_WORKERS", "4"))
+EVAL_JOB_QUEUE_SIZE: int = int(os.environ.get("EVAL_JOB_QUEUE_SIZE", "1000"))
+EVAL_JOB_HISTORY: int = int(os.environ.get("EVAL_JOB_HISTORY", "10000"))
+
+# Merge evaluations for the same GitHub user that arrive within this many
+# seconds of each other and apply them once (0 disables). Policy is
+# "latest" (last evaluation wins) or "max" (highest score wins).
+EVAL_DEBOUNCE_SECONDS: float = float(os.environ.get("EVAL_DEBOUNCE_SECONDS", "0"))
+EVAL_COALESCE_POLICY: str = os.environ.get("EVAL_COALESCE_POLICY", "latest")
+
+# Replay the first response for repeated X-Delivery-Id values within the TTL.
+# With DEDUP_HASH_FALLBACK=1, requests without the header are keyed by body hash.
+# At-least-once: after a crash, a retry of a delivery whose entry wasn't
+# flushed yet is applied again (a replay never refers to an unsaved score).
+DEDUP_TTL_SECONDS: float = float(os.environ.get("DEDUP_TTL_SECONDS", "86400"))
+DEDUP_MAX_ENTRIES: int = int(os.environ.get("DEDUP_MAX_ENTRIES", "10000"))
+DEDUP_HASH_FALLBACK: bool = os.environ.get("DEDUP_HASH_FALLBACK", "0") == "1"
+
+# Maximum number of results accepted by /webhook/eval/batch
+EVAL_BATCH_MAX_ITEMS: int = int(os.environ.get("EVAL_BATCH_MAX_ITEMS", "1000"))
+
+# Outbound Discord writes: max concurrent REST calls and queued actions per lane
+DISCORD_MAX_IN_FLIGHT: int = int(os.environ.get("DISCORD_MAX_IN_FLIGHT", "4"))
+DISCORD_LANE_SIZE: int = int(os.environ.get("DISCORD_LANE_SIZE", "1000"))
+
+# Discord side effects of evaluations received while their guild's shard isn't
+# connected are held (persisted to DEFERRED_FILE) and replayed once it is back:
+# at most this many, for at most this many seconds, this many at a time
+DEFERRED_MAX_EVENTS: int = int(os.environ.get("DEFERRED_MAX_EVENTS", "10000"))
+DEFERRED_TTL_SECONDS: float = float(os.environ.get("DEFERRED_TTL_SECONDS", "3600"))
+DEFERRED_DRAIN_CONCURRENCY: int = int(os.environ.get("DEFERRED_DRAIN_CONCURRENCY", "4"))
+
+# Max concurrent role fixes during startup / on-demand role reconciliation
+RECONCILE_CONCURRENCY: int = int(os.environ.get("RECONCILE_CONCURRENCY", "8"))
+
+# Member lookups that miss the gateway cache: how long fetched members and
+# "not in guild" results are remembered, and how many entries to keep
+MEMBER_CACHE_TTL: float = float(os.environ.get("MEMBER_CACHE_TTL", "600"))
+MEMBER_NEGATIVE_TTL: float = float(os.environ.get("MEMBER_NEGATIVE_TTL", "60"))
+MEMBER_CACHE_SIZE: int = int(os.environ.get("MEMBER_CACHE_SIZE", "10000"))
+
 NOTIFICATION_CHANNEL_ID: int = int(os.environ.get("NOTIFICATION_CHANNEL_ID", "0"))
 
-DATA_DIR: str = os.path.join(os.path.dirname(__file__), "data")
+# Promotion channels of other guilds as "guild_id:channel_id,...";
+# NOTIFICATION_CHANNEL_ID is the default guild's channel
+NOTIFICATION_CHANNEL_IDS: dict[int, int] = {GUILD_ID: NOTIFICATION_CHANNEL_ID} | {
+    int(guild): int(channel)
+    for guild, channel in (
+        pair.split(":") for pair in os.environ.get("NOTIFICATION_CHANNEL_IDS", "").split(",") if pair.strip()
+    )
+}
+
+# Merge promotions within this many seconds into one announcement (0 = send each immediately)
+PROMOTION_BATCH_SECONDS: float = float(os.environ.get("PROMOTION_BATCH_SECONDS", "0"))
+
+DATA_DIR: str = os.environ.get("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
 USERS_FILE: str = os.path.join(DATA_DIR, "users.json")
+SQLITE_FILE: str = os.path.join(DATA_DIR, "users.db")
+DELIVERIES_FILE: str = os.path.join(DATA_DIR, "deliveries.json")
+HISTORY_FILE: str = os.path.join(DATA_DIR, "history.bin")
+HISTORY_FEEDBACK_FILE: str = os.path.join(DATA_DIR, "history_feedback.bin")
+OUTBOX_FILE: str = os.path.join(DATA_DIR, "outbox.db")
+DELIVERIES_DB: str = os.path.join(DATA_DIR, "deliveries.db")  # shared by API workers
+DEFERRED_FILE: str = os.path.join(DATA_DIR, "deferred.json")
+FEEDBACK_DIR: str = os.path.join(DATA_DIR, "feedback")  # content-addressed feedback archive
+COMMAND_SYNC_FILE: str = os.path.join(DATA_DIR, "command_sync.json")  # hashes of synced command trees
+PROFILES_DIR: str = os.path.join(DATA_DIR, "profiles")  # folded stacks from the sampling profiler
+# Scores and history of guilds other than the default live in GUILDS_DIR/<guild_id>/
+GUILDS_DIR: str = os.path.join(DATA_DIR, "guilds")
+
+# "json" (users.json) or "sqlite" (users.db, WAL mode)
+STORAGE_BACKEND: str = os.environ.get("STORAGE_BACKEND", "json")
+
+# Disk cap of each guild's feedback archive; least recently read texts go first
+FEEDBACK_ARCHIVE_MAX_BYTES: int = int(os.environ.get("FEEDBACK_ARCHIVE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Log the span tree of webhook requests, commands and jobs slower than this (0 = never)
+TRACE_SLOW_SECONDS: float = float(os.environ.get("TRACE_SLOW_SECONDS", "1"))
+# Sampling profiler (toggled with /profiler or SIGUSR2): seconds between
+# stack samples, and whether to start it with the process
+PROFILE_INTERVAL: float = float(os.environ.get("PROFILE_INTERVAL", "0.01"))
+PROFILE_ON_START: bool = os.environ.get("PROFILE_ON_START", "0") == "1"
+
+# Seconds between write-behind flushes of the score store
+SCORE_FLUSH_INTERVAL: float = float(os.environ.get("SCORE_FLUSH_INTERVAL", "5"))
 
 RANKS: list[str] = ["G", "F", "E", "D", "C", "B", "A", "S"]
 
@@ -25,6 +150,9 @@ RANK_THRESHOLDS: dict[str, int] = {
     "S": 8000,
 }
 
+LEADERBOARD_PAGE_SIZE: int = int(os.environ.get("LEADERBOARD_PAGE_SIZE", "10"))
+HISTORY_PAGE_SIZE: int = int(os.environ.get("HISTORY_PAGE_SIZE", "10"))
+
 TEMPLATE_REPO_URL: str = os.environ.get(
     "TEMPLATE_REPO_URL",
     "https://github.com/your-org/git-eval-template",
@@ -1,61 +1,371 @@
+import argparse
 import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager, nullcontext
+
 import discord
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 
-from bot.config import DISCORD_TOKEN, GUILD_ID, RANKS, RANK_NAMES
+from bot.config import (
+    DISCORD_TOKEN, GUILD_IDS, SCORE_FLUSH_INTERVAL, STORAGE_BACKEND,
+    PROCESS_MODE, API_HOST, API_PORT, API_WORKERS, GATEWAY_PORT, PROFILE_ON_START,
+)
+from bot.services import (
+    command_sync, debounce, dedup, deferred, history, jobs, members, metrics, outbox, profiler,
+    role as role_service, scheduler, score as score_service, tracing,
+)
+from bot.services.reconcile import reconcile_roles
 from bot.state import bot
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Git-Eval Webhook API")
 
+_reconciled_on_startup: set[int] = set()  # guild IDs
+_api_server: uvicorn.Server | None = None
+_shutting_down = False
+
+
+def _flush_scores_and_deliveries():
+    # Delivery IDs are captured before the scores are written (see dedup.flush)
+    def scores():
+        score_service.flush()
+        history.flush()
+
+    dedup.flush(before_write=scores)
+
+
+# Write-behind stores flushed every SCORE_FLUSH_INTERVAL and on shutdown
+_FLUSHERS = [_flush_scores_and_deliveries, deferred.flush]
+
 
 @app.get("/health")
 async def health():
     return {
         "status": "ok",
+        "mode": PROCESS_MODE,
         "bot_ready": bot.is_ready(),
         "bot_user": str(bot.user) if bot.user else None,
+        "shards": {
+            shard_id: {"latency": shard.latency, "closed": shard.is_closed()}
+            for shard_id, shard in bot.shards.items()
+        },
+        "guilds": {guild_id: bot.get_guild(guild_id) is not None for guild_id in GUILD_IDS},
+        "discord_queue": scheduler.stats(),
+        "job_queue_depth": jobs.depth(),
+        "deferred": deferred.stats(),
+        "profiler": profiler.stats(),
+        **({"outbox_depth": outbox.depth()} if PROCESS_MODE == "gateway" else {}),
     }
 
 
+# Only these get their own series; anything else (404s included) stays unlabelled
+_OBSERVED_ENDPOINTS = frozenset({"/webhook/eval", "/webhook/eval/batch"})
+
+
+@app.middleware("http")
+async def _observe_webhooks(request: Request, call_next):
+    endpoint = request.url.path
+    if endpoint not in _OBSERVED_ENDPOINTS:
+        return await call_next(request)
+    with (
+        tracing.trace(f"{request.method} {endpoint}") as root,
+        metrics.WEBHOOK_LATENCY.time(endpoint=endpoint),
+    ):
+        response = await call_next(request)
+        root.attrs["status"] = response.status_code
+        # Handling time for the sender; per-step timings only while debugging
+        response.headers["Server-Timing"] = tracing.server_timing(root)
+    metrics.WEBHOOK_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+
+metrics.Gauge(
+    "git_eval_gateway_latency_seconds", "Discord gateway heartbeat latency per shard",
+    lambda: {shard_id: latency for shard_id, latency in bot.latencies} if bot.is_ready() else None,
+    labels=("shard",),
+)
+metrics.Gauge(
+    "git_eval_queue_depth", "Items waiting in internal queues",
+    lambda: {
+        "jobs": jobs.depth(),
+        "debounce": debounce.depth(),
+        "deferred": deferred.depth(),
+        **({"outbox": outbox.depth()} if PROCESS_MODE != "all" else {}),
+        **{f"discord_{lane}": n for lane, n in scheduler.stats()["queues"].items()},
+    },
+    labels=("queue",),
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @bot.event
 async def on_ready():
-    guild_obj = bot.get_guild(GUILD_ID)
-    if guild_obj:
-        # Ensure all rank roles exist
-        existing_roles = {r.name for r in guild_obj.roles}
-        for rank in RANKS:
-            role_name = f"Git-Eval: {rank} ({RANK_NAMES[rank]})"
-            if role_name not in existing_roles:
-                await guild_obj.create_role(name=role_name)
-                print(f"Created role: {role_name}")
-
-    guild = discord.Object(id=GUILD_ID)
-    bot.tree.copy_global_to(guild=guild)
-    await bot.tree.sync(guild=guild)
-    print(f"Bot ready: {bot.user} | Guild: {GUILD_ID}")
+    # Fires once every shard is connected (and again after full reconnects)
+    for guild_id in GUILD_IDS:
+        guild_obj = bot.get_guild(guild_id)
+        if guild_obj:
+            # Ensure all rank roles exist
+            await role_service.ensure_rank_roles(guild_obj)
+
+            # Reconcile each guild once per process, in the background
+            if guild_id not in _reconciled_on_startup:
+                _reconciled_on_startup.add(guild_id)
+                asyncio.create_task(_reconcile(guild_obj))
+        else:
+            logger.warning("Guild %s not found; is the bot a member?", guild_id)
+
+        # Only when the commands differ from the last sync to this guild
+        await command_sync.sync_guild(bot.tree, guild_id)
+
+    # Side effects of webhooks that arrived while we were connecting
+    asyncio.create_task(_drain_deferred())
+    print(f"Bot ready: {bot.user} | Shards: {bot.shard_count} | Guilds: {GUILD_IDS}")
+
+
+@bot.event
+async def on_resumed():
+    asyncio.create_task(_drain_deferred())
+
+
+@bot.event
+async def on_guild_available(guild: discord.Guild):
+    # Also fires when a shard reconnects with a new session or a guild outage ends
+    asyncio.create_task(_drain_deferred())
+
+
+async def _drain_deferred():
+    try:
+        await deferred.drain()
+    except Exception:
+        logger.exception("Replaying held Discord side effects failed")
+
+
+async def _reconcile(guild: discord.Guild):
+    try:
+        await reconcile_roles(guild)
+    except Exception:
+        logger.exception("Startup role reconciliation failed")
+
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    role_service.refresh_role_cache(role.guild)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    if before.name != after.name:
+        role_service.refresh_role_cache(after.guild)
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    role_service.refresh_role_cache(role.guild)
+
+
+@bot.event
+async def on_member_join(member: discord.Member):
+    members.invalidate(member.guild.id, member.id)
+
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    members.invalidate(member.guild.id, member.id)
+
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    members.invalidate(after.guild.id, after.id)
+
+
+async def _flush_periodically():
+    while True:
+        await asyncio.sleep(SCORE_FLUSH_INTERVAL)
+        for flush in _FLUSHERS:
+            try:
+                await asyncio.to_thread(flush)
+            except Exception:
+                logger.exception("Periodic flush failed: %s.%s", flush.__module__, flush.__qualname__)
 
 
 async def _start_api():
-    config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info")
+    global _api_server
+    # The gateway process only serves /health and /metrics, on its own port
+    port = API_PORT if PROCESS_MODE == "all" else GATEWAY_PORT
+    config = uvicorn.Config(app, host=API_HOST, port=port, log_level="info")
     server = uvicorn.Server(config)
+    # uvicorn would re-raise SIGTERM/SIGINT once it stops serving, killing the
+    # process before the final flush; _install_shutdown_handlers owns them
+    server.capture_signals = nullcontext
+    _api_server = server
     await server.serve()
 
 
-async def main():
+async def _load_state():
+    # Load persisted state up front so the first request doesn't pay for it
+    await asyncio.to_thread(score_service.load)
+    await asyncio.to_thread(dedup.load)
+    await asyncio.to_thread(history.load)
+    await asyncio.to_thread(deferred.load)
+
+
+def _watch_profiler_signal():
+    """Toggle the sampling profiler on SIGUSR2 (Unix only)."""
+    if PROFILE_ON_START:
+        profiler.start()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, profiler.toggle)
+    except (AttributeError, NotImplementedError):
+        logger.info("SIGUSR2 not available; use /profiler to toggle the profiler")
+
+
+def _close_state():
+    profiler.stop()
+    for flush in _FLUSHERS:
+        flush()
+    score_service.close()
+    outbox.close()
+
+
+async def _drain_discord_work():
+    """Finish pending Discord work on shutdown.
+
+    Needs the client's HTTP session, so it runs before the bot closes. A
+    failing step is logged and the rest still run.
+    """
+    for step in (debounce.flush_all, jobs.stop, role_service.flush_promotions, scheduler.stop):
+        try:
+            await step()
+        except Exception:
+            logger.exception("Shutdown step %s failed", step.__qualname__)
+
+
+async def _shutdown(sig: signal.Signals):
+    global _shutting_down
+    if _shutting_down:
+        return
+    _shutting_down = True
+    logger.info("Received %s; shutting down", sig.name)
+    if _api_server:
+        _api_server.should_exit = True
+    await _drain_discord_work()
+    # bot.start() returns, and main() unwinds through the final flush
+    await bot.close()
+
+
+def _install_shutdown_handlers():
+    """SIGTERM, SIGINT and SIGHUP (tmux kill-session) stop the bot gracefully."""
+    loop = asyncio.get_running_loop()
+    for name in ("SIGTERM", "SIGINT", "SIGHUP"):
+        sig = getattr(signal, name, None)
+        if sig is None:
+            continue
+        try:
+            loop.add_signal_handler(sig, lambda sig=sig: asyncio.create_task(_shutdown(sig)))
+        except NotImplementedError:  # Windows event loops
+            pass
+
+
+async def _load_extensions():
     await bot.load_extension("bot.cogs.register")
     await bot.load_extension("bot.cogs.status")
     await bot.load_extension("bot.cogs.guide")
+    await bot.load_extension("bot.cogs.leaderboard")
+    await bot.load_extension("bot.cogs.history")
+    await bot.load_extension("bot.cogs.feedback")
+    await bot.load_extension("bot.cogs.admin")
 
-    from bot.api.webhook import router
-    app.include_router(router)
 
+async def manage_commands(clear: bool = False):
+    """--sync / --clear: (re-)register or remove the slash commands over REST, then exit."""
+    await _load_extensions()
     async with bot:
-        await asyncio.gather(
-            bot.start(DISCORD_TOKEN),
-            _start_api(),
-        )
+        await bot.login(DISCORD_TOKEN)
+        if clear:
+            await command_sync.clear(bot.tree, GUILD_IDS)
+            print(f"Cleared global commands and those of guilds {GUILD_IDS}.")
+            return
+        for guild_id in GUILD_IDS:
+            await command_sync.sync_guild(bot.tree, guild_id, force=True)
+        print(f"Synced commands to guilds {GUILD_IDS}.")
+
+
+async def main():
+    """Gateway and cogs, plus the webhook API unless PROCESS_MODE=gateway."""
+    await _load_extensions()
+
+    if PROCESS_MODE == "all":
+        from bot.api.webhook import router
+        app.include_router(router)
+
+    await _load_state()
+    _watch_profiler_signal()
+    _install_shutdown_handlers()
+    flusher = asyncio.create_task(_flush_periodically())
+    jobs.start()
+    scheduler.start()
+
+    try:
+        async with bot:
+            try:
+                await asyncio.gather(
+                    bot.start(DISCORD_TOKEN),
+                    _start_api(),
+                )
+            finally:
+                await _drain_discord_work()
+    finally:
+        flusher.cancel()
+        _close_state()
+
+
+@asynccontextmanager
+async def _api_worker_lifespan(app: FastAPI):
+    await _load_state()
+    _watch_profiler_signal()
+    flusher = asyncio.create_task(_flush_periodically())
+    try:
+        yield
+    finally:
+        await debounce.flush_all()
+        flusher.cancel()
+        _close_state()
+
+
+def api_app() -> FastAPI:
+    """App factory for the uvicorn workers of PROCESS_MODE=api (no gateway connection)."""
+    from bot.api.webhook import router
+    app.include_router(router)
+    app.router.lifespan_context = _api_worker_lifespan
+    return app
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Git-Eval bot (gateway and/or webhook API per PROCESS_MODE)")
+    tool = parser.add_mutually_exclusive_group()
+    tool.add_argument("--sync", action="store_true", help="force a slash-command sync to every guild and exit")
+    tool.add_argument("--clear", action="store_true", help="remove all guild and global slash commands and exit")
+    args = parser.parse_args()
+    if args.sync or args.clear:
+        asyncio.run(manage_commands(clear=args.clear))
+        raise SystemExit(0)
+
+    if PROCESS_MODE not in ("all", "api", "gateway"):
+        raise SystemExit(f"Unknown PROCESS_MODE: {PROCESS_MODE!r}")
+    if PROCESS_MODE != "all" and STORAGE_BACKEND != "sqlite":
+        raise SystemExit("PROCESS_MODE=api/gateway needs STORAGE_BACKEND=sqlite (shared between processes)")
+    if PROCESS_MODE == "api":
+        uvicorn.run(
+            "bot.main:api_app", factory=True, host=API_HOST, port=API_PORT,
+            workers=API_WORKERS, log_level="info",
+        )
+    else:
+        asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Slash-command registration, skipped when nothing changed.
+
+Syncing a guild's commands is a rate-limited REST call, and on_ready fires
+on every start and full reconnect. The payload Discord would receive is
+hashed per (application, guild) and the hash kept in COMMAND_SYNC_FILE;
+a guild is only synced again when its hash differs. Commands changed from
+outside (another deployment, the developer portal) aren't noticed, so
+`python -m bot.main --sync` forces a sync and `--clear` removes them all.
+"""
+import hashlib
+import json
+import logging
+import os
+
+import discord
+from discord import app_commands
+
+from bot.config import COMMAND_SYNC_FILE
+
+logger = logging.getLogger(__name__)
+
+
+def _load() -> dict[str, str]:
+    if not os.path.exists(COMMAND_SYNC_FILE):
+        return {}
+    with open(COMMAND_SYNC_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(hashes: dict[str, str]) -> None:
+    os.makedirs(os.path.dirname(COMMAND_SYNC_FILE), exist_ok=True)
+    tmp_path = f"{COMMAND_SYNC_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(tmp_path, COMMAND_SYNC_FILE)
+
+
+def _key(tree: app_commands.CommandTree, guild_id: int) -> str:
+    return f"{tree.client.application_id}:{guild_id}"
+
+
+def fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """Hash of the commands a sync of this guild would register."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda data: (data.get("type", 1), data["name"]),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_guild(tree: app_commands.CommandTree, guild_id: int, force: bool = False) -> bool:
+    """Register the global commands in the guild unless already done; True if synced."""
+    guild = discord.Object(id=guild_id)
+    tree.copy_global_to(guild=guild)
+    digest = fingerprint(tree, guild)
+    hashes = _load()
+    if not force and hashes.get(_key(tree, guild_id)) == digest:
+        logger.info("Commands of guild %s unchanged; skipping sync", guild_id)
+        return False
+    synced = await tree.sync(guild=guild)
+    hashes[_key(tree, guild_id)] = digest
+    _save(hashes)
+    logger.info("Synced %d commands to guild %s", len(synced), guild_id)
+    return True
+
+
+async def clear(tree: app_commands.CommandTree, guild_ids: list[int]) -> None:
+    """Remove the bot's commands from the guilds and globally, and forget the hashes."""
+    for guild_id in guild_ids:
+        guild = discord.Object(id=guild_id)
+        tree.clear_commands(guild=guild)
+        await tree.sync(guild=guild)
+        logger.info("Cleared commands of guild %s", guild_id)
+    tree.clear_commands(guild=None)
+    await tree.sync()
+    logger.info("Cleared global commands")
+    hashes = _load()
+    for guild_id in guild_ids:
+        hashes.pop(_key(tree, guild_id), None)
+    _save(hashes)
@@ -0,0 +1,147 @@
+"""Coalesce bursts of evaluations per GitHub user into a single application.
+
+Each new evaluation restarts the user's window; when it expires the merged
+result is applied once: one add_score, one role update, one DM.
+
+Windows live in memory only, so their deliveries aren't recorded in dedup
+until the window is applied: a crash inside the window loses nothing a
+retry of the same delivery can't bring back.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from bot.config import EVAL_DEBOUNCE_SECONDS, EVAL_COALESCE_POLICY, PROCESS_MODE
+from bot.services import dedup, jobs, store, tracing
+from bot.services.effects import DEFERRED, apply_eval_effects
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingEval:
+    guild_id: int
+    discord_id: str
+    score: int
+    feedback: str
+    rank: str | None
+    count: int = 1
+    first_at: float = field(default_factory=time.time)
+    # dedup keys of the merged deliveries, recorded once the window is applied
+    delivery_keys: list[str] = field(default_factory=list)
+    timer: asyncio.Task | None = field(default=None, repr=False)
+
+    def merge(self, score: int, feedback: str, rank: str | None) -> None:
+        self.count += 1
+        if EVAL_COALESCE_POLICY == "max" and score < self.score:
+            return
+        self.score, self.feedback, self.rank = score, feedback, rank
+
+
+_pending: dict[tuple[int, str], PendingEval] = {}
+
+
+def enabled() -> bool:
+    return EVAL_DEBOUNCE_SECONDS > 0
+
+
+def depth() -> int:
+    return len(_pending)
+
+
+def submit(
+    guild_id: int, discord_id: str, github_username: str, score: int, feedback: str,
+    rank: str | None, delivery_key: str | None = None,
+) -> PendingEval:
+    """Add an evaluation to the user's window and (re)start its timer."""
+    key = (guild_id, github_username.lower())
+    pending = _pending.get(key)
+    if pending and pending.discord_id == discord_id:
+        if delivery_key is not None and delivery_key in pending.delivery_keys:
+            return pending  # a retry of a delivery already in the window
+        pending.merge(score, feedback, rank)
+        pending.timer.cancel()
+    else:
+        if pending:
+            # Username was re-registered to another account; settle the old one now
+            pending.timer.cancel()
+            asyncio.create_task(_apply(pending))
+        pending = PendingEval(guild_id, discord_id, score, feedback, rank)
+        _pending[key] = pending
+    if delivery_key is not None:
+        pending.delivery_keys.append(delivery_key)
+    pending.timer = asyncio.create_task(_fire(key, pending))
+    return pending
+
+
+async def _fire(key: tuple[int, str], pending: PendingEval) -> None:
+    await asyncio.sleep(EVAL_DEBOUNCE_SECONDS)
+    if _pending.get(key) is pending:
+        del _pending[key]
+    await _apply(pending)
+
+
+async def _apply(pending: PendingEval) -> None:
+    with tracing.trace("debounce.apply", guild=pending.guild_id, member=pending.discord_id):
+        await _apply_traced(pending)
+
+
+async def _apply_traced(pending: PendingEval) -> None:
+    try:
+        old_rank, new_rank, new_score = await store.add_score(
+            pending.guild_id, pending.discord_id, pending.score,
+            eval_rank=pending.rank, feedback=pending.feedback,
+        )
+        result = {
+            "guild_id": pending.guild_id,
+            "discord_id": pending.discord_id,
+            "old_rank": old_rank,
+            "new_rank": new_rank,
+            "score": new_score,
+            "coalesced": pending.count,
+        }
+        if PROCESS_MODE == "api":
+            # No gateway connection here; the gateway process applies the effects
+            job = await jobs.submit(
+                pending.guild_id, pending.discord_id, old_rank, new_rank, new_score,
+                pending.score, pending.feedback,
+            )
+            logger.info(
+                "Applied %d coalesced evaluation(s) for %s: %s -> %s (%d pt), job %s",
+                pending.count, pending.discord_id, old_rank, new_rank, new_score, job.id,
+            )
+            await _record(pending, 202, {"status": "accepted", "job_id": job.id, **result})
+            return
+        promoted, discord_error = await apply_eval_effects(
+            pending.guild_id, pending.discord_id, old_rank, new_rank, new_score,
+            pending.score, pending.feedback,
+        )
+        logger.info(
+            "Applied %d coalesced evaluation(s) for %s: %s -> %s (%d pt)%s",
+            pending.count, pending.discord_id, old_rank, new_rank, new_score,
+            f" discord_error={discord_error}" if discord_error else "",
+        )
+        if discord_error == DEFERRED:
+            await _record(pending, 202, {"status": "deferred", **result})
+        else:
+            await _record(pending, 200, {
+                "status": "ok", **result, "promoted": promoted, "discord_error": discord_error,
+            })
+    except Exception:
+        logger.exception("Failed to apply coalesced evaluation for %s", pending.discord_id)
+
+
+async def _record(pending: PendingEval, status: int, body: dict) -> None:
+    """Let retries of the window's deliveries replay its outcome from now on."""
+    for key in pending.delivery_keys:
+        await dedup.put_async(key, status, body)
+
+
+async def flush_all() -> None:
+    """Apply every pending window immediately (used on shutdown)."""
+    pending = list(_pending.values())
+    _pending.clear()
+    for p in pending:
+        p.timer.cancel()
+    await asyncio.gather(*(_apply(p) for p in pending))
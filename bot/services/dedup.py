@@ -0,0 +1,202 @@
+"""TTL cache of webhook responses keyed by delivery ID.
+
+Retried or re-run deliveries get the original response replayed without
+touching the score store or Discord. Entries are persisted next to the
+score store so a restart doesn't reopen the window. With PROCESS_MODE=api
+the API workers share entries through a SQLite table instead, so a retry
+landing on another worker is still replayed.
+
+Delivery handling is at-least-once, not exactly-once: entries are recorded
+after the score change they answer for and persisted separately. flush()
+captures entries before the score store is written (see its docstring),
+so a crash can lose the entry for a saved score, and a retry is then
+applied again, but never leaves an entry replaying a score that wasn't
+saved. The SQLite backend commits scores immediately, so the same holds
+there and for the shared table of PROCESS_MODE=api. Provisional responses
+(a debounce window that is still open) aren't recorded at all; the window
+records the final one when it is applied.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from bot.config import (
+    DELIVERIES_FILE, DELIVERIES_DB, DEDUP_TTL_SECONDS, DEDUP_MAX_ENTRIES, PROCESS_MODE,
+)
+
+logger = logging.getLogger(__name__)
+
+Response = tuple[int, dict[str, Any]]
+
+# key -> (expires_at, status_code, body); ordered oldest first
+_entries: OrderedDict[str, tuple[float, int, dict[str, Any]]] | None = None
+_inflight: dict[str, asyncio.Future] = {}
+_dirty = False
+_lock = threading.Lock()
+_SHARED = PROCESS_MODE == "api"
+_db: sqlite3.Connection | None = None
+
+
+def _shared_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                os.makedirs(os.path.dirname(DELIVERIES_DB), exist_ok=True)
+                conn = sqlite3.connect(DELIVERIES_DB, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(
+                    "CREATE TABLE IF NOT EXISTS deliveries ("
+                    " key TEXT PRIMARY KEY, expires_at REAL NOT NULL,"
+                    " status INTEGER NOT NULL, body TEXT NOT NULL);"
+                    "CREATE INDEX IF NOT EXISTS deliveries_expires ON deliveries (expires_at);"
+                )
+                _db = conn
+    return _db
+
+
+def _data() -> OrderedDict[str, tuple[float, int, dict[str, Any]]]:
+    global _entries
+    if _entries is None:
+        entries: OrderedDict[str, tuple[float, int, dict[str, Any]]] = OrderedDict()
+        if not _SHARED and os.path.exists(DELIVERIES_FILE):
+            with open(DELIVERIES_FILE, "r", encoding="utf-8") as f:
+                for key, (expires_at, status, body) in json.load(f).items():
+                    entries[key] = (expires_at, status, body)
+        _entries = entries
+        _evict()
+    return _entries
+
+
+def _evict() -> None:
+    global _dirty
+    now = time.time()
+    entries = _entries
+    while entries and (
+        len(entries) > DEDUP_MAX_ENTRIES or next(iter(entries.values()))[0] <= now
+    ):
+        entries.popitem(last=False)
+        _dirty = True
+
+
+def load() -> None:
+    _data()
+
+
+def get(key: str) -> Response | None:
+    entry = _data().get(key)
+    if entry and entry[0] > time.time():
+        return entry[1], entry[2]
+    if _SHARED:
+        db = _shared_db()
+        with _lock:
+            row = db.execute(
+                "SELECT status, body FROM deliveries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row:
+            return row[0], json.loads(row[1])
+    return None
+
+
+def put(key: str, status: int, body: dict[str, Any]) -> None:
+    global _dirty
+    entries = _data()
+    expires_at = time.time() + DEDUP_TTL_SECONDS
+    with _lock:
+        entries.pop(key, None)
+        entries[key] = (expires_at, status, body)
+        _dirty = True
+        _evict()
+    if _SHARED:
+        db = _shared_db()
+        with _lock:
+            db.execute("DELETE FROM deliveries WHERE expires_at <= ?", (time.time(),))
+            db.execute(
+                "INSERT OR REPLACE INTO deliveries (key, expires_at, status, body) "
+                "VALUES (?, ?, ?, ?)",
+                (key, expires_at, status, json.dumps(body, ensure_ascii=False)),
+            )
+
+
+async def _off_loop(fn: Callable[..., Any], *args: Any) -> Any:
+    """Shared mode queries SQLite, which can wait on other workers' write locks."""
+    if _SHARED:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def put_async(key: str, status: int, body: dict[str, Any]) -> None:
+    """put() for callers on the event loop."""
+    await _off_loop(put, key, status, body)
+
+
+async def run_once(
+    key: str,
+    handler: Callable[[], Awaitable[Response]],
+    record: Callable[[Response], bool] | None = None,
+) -> tuple[Response, bool]:
+    """Run handler once per key. Returns (response, replayed).
+
+    Concurrent duplicates wait for the in-flight delivery instead of
+    running again. Exceptions aren't cached, so failed deliveries can retry;
+    neither are responses record() rejects.
+    """
+    cached = await _off_loop(get, key)
+    if cached:
+        return cached, True
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key]), True
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        response = await handler()
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody is waiting
+        raise
+    else:
+        if record is None or record(response):
+            await put_async(key, *response)
+        future.set_result(response)
+        return response, False
+    finally:
+        del _inflight[key]
+
+
+def flush(before_write: Callable[[], Any] | None = None) -> bool:
+    """Persist the entries, running before_write (the score flush) in between.
+
+    Entries are captured first and written after before_write, so every
+    persisted entry's score change is persisted too.
+    """
+    global _dirty
+    snapshot = None
+    with _lock:
+        if not _SHARED and _dirty and _entries is not None:
+            snapshot = {key: list(entry) for key, entry in _entries.items()}
+            _dirty = False
+    try:
+        if before_write:
+            before_write()
+        if snapshot is None:
+            return False
+        os.makedirs(os.path.dirname(DELIVERIES_FILE), exist_ok=True)
+        tmp_path = f"{DELIVERIES_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, DELIVERIES_FILE)
+    except BaseException:
+        if snapshot is not None:
+            with _lock:
+                _dirty = True
+        raise
+    return True
@@ -0,0 +1,204 @@
+"""Discord side effects held back while the gateway is not ready.
+
+During startup, while a shard is disconnected or reconnecting with a new
+session, and while Discord reports a guild unavailable, the guild cache is
+missing or stale and every role sync / DM of a webhook would fail. Effects
+that arrive then are held here instead (bounded, persisted next to the
+score store) and replayed with bounded concurrency once the gateway is back
+(on_ready, on_resumed, on_guild_available).
+Entries pushed out by a full buffer or older than DEFERRED_TTL_SECONDS are
+dropped, logged and counted.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import discord
+
+from bot.config import (
+    DEFERRED_FILE, DEFERRED_MAX_EVENTS, DEFERRED_TTL_SECONDS, DEFERRED_DRAIN_CONCURRENCY,
+)
+from bot.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_FIELDS = ("guild_id", "discord_id", "old_rank", "new_rank", "score", "points", "feedback")
+
+# Oldest first; each entry is _FIELDS plus "held_at"
+_entries: deque[dict[str, Any]] | None = None
+_dirty = False
+_lock = threading.Lock()
+_draining: asyncio.Lock | None = None
+_stats = {"held": 0, "replayed": 0, "overflow": 0, "expired": 0}
+
+
+def _data() -> deque[dict[str, Any]]:
+    global _entries
+    if _entries is None:
+        entries: deque[dict[str, Any]] = deque()
+        if os.path.exists(DEFERRED_FILE):
+            with open(DEFERRED_FILE, "r", encoding="utf-8") as f:
+                entries.extend(json.load(f))
+        _entries = entries
+        if entries:
+            logger.info("Loaded %d held Discord side effects", len(entries))
+    return _entries
+
+
+def _drop(entry: dict[str, Any], reason: str) -> None:
+    _stats[reason] += 1
+    metrics.DEFERRED_DROPPED.inc(reason=reason)
+    logger.warning(
+        "Dropped held Discord side effects for %s in guild %s (%s -> %s, %d pt): %s",
+        entry["discord_id"], entry["guild_id"], entry["old_rank"], entry["new_rank"],
+        entry["score"], reason,
+    )
+
+
+def load() -> None:
+    _data()
+
+
+def ready_guild(guild_id: int) -> discord.Guild | None:
+    """The guild if effects on it can run now, else None.
+
+    bot.is_ready() stays True after the first READY, through every later
+    disconnect, so the guild's own availability and shard are checked too.
+    """
+    from bot.state import bot
+
+    if not bot.is_ready():
+        return None
+    guild = bot.get_guild(guild_id)
+    if guild is None or guild.unavailable:
+        return None
+    shard = bot.get_shard(guild.shard_id)
+    if shard is None or shard.is_closed():
+        return None
+    return guild
+
+
+def hold(
+    guild_id: int, discord_id: str, old_rank: str, new_rank: str, score: int, points: int,
+    feedback: str,
+) -> None:
+    """Keep the effects of one evaluation until their guild is ready."""
+    global _dirty
+    entries = _data()
+    entry = {
+        "guild_id": guild_id, "discord_id": discord_id, "old_rank": old_rank,
+        "new_rank": new_rank, "score": score, "points": points, "feedback": feedback,
+        "held_at": time.time(),
+    }
+    with _lock:
+        entries.append(entry)
+        _stats["held"] += 1
+        _dirty = True
+        # Keep the newest; the oldest effects are the most likely to be stale
+        overflow = [entries.popleft() for _ in range(len(entries) - DEFERRED_MAX_EVENTS)]
+    for dropped in overflow:
+        _drop(dropped, "overflow")
+
+
+async def drain() -> int:
+    """Replay held effects with bounded concurrency; returns how many ran.
+
+    Keeps going while the gateway stays ready, so effects held during the
+    replay aren't left behind. Effects for guilds that aren't ready stay
+    held until the next on_ready/on_resumed/on_guild_available.
+    """
+    global _draining
+    from bot.state import bot
+
+    if _draining is None:
+        _draining = asyncio.Lock()
+    if _draining.locked():
+        return 0  # the running drain picks up anything held meanwhile
+
+    replayed = 0
+    async with _draining:
+        while bot.is_ready():
+            with _lock:
+                batch = list(_data())
+                _entries.clear()
+            if not batch:
+                break
+            ran = await _replay(batch)
+            if not ran:
+                break  # only guilds that are still unreachable are left
+            replayed += ran
+    return replayed
+
+
+async def _replay(batch: list[dict[str, Any]]) -> int:
+    global _dirty
+    from bot.services.effects import apply_eval_effects
+
+    cutoff = time.time() - DEFERRED_TTL_SECONDS
+    due, waiting = [], []
+    for entry in batch:
+        if entry["held_at"] < cutoff:
+            _drop(entry, "expired")
+        elif ready_guild(entry["guild_id"]) is None:
+            waiting.append(entry)
+        else:
+            due.append(entry)
+    if waiting:
+        # Back to the front, keeping held_at so the TTL still counts from the first hold
+        with _lock:
+            _data().extendleft(reversed(waiting))
+    if not due:
+        with _lock:
+            _dirty = True  # persist any expired drops
+        return 0
+    logger.info("Replaying %d held Discord side effects", len(due))
+
+    semaphore = asyncio.Semaphore(DEFERRED_DRAIN_CONCURRENCY)
+
+    # Effects for one member stay in order; different members run concurrently
+    by_member: dict[tuple[int, str], list[dict[str, Any]]] = {}
+    for entry in due:
+        by_member.setdefault((entry["guild_id"], entry["discord_id"]), []).append(entry)
+
+    async def replay_member(entries: list[dict[str, Any]]) -> None:
+        for entry in entries:
+            async with semaphore:
+                try:
+                    await apply_eval_effects(*(entry[name] for name in _FIELDS))
+                except Exception:
+                    logger.exception("Replaying held effects for %s failed", entry["discord_id"])
+
+    await asyncio.gather(*(replay_member(entries) for entries in by_member.values()))
+    _stats["replayed"] += len(due)
+    # Persist the removal only now, so a crash mid-replay keeps the file
+    with _lock:
+        _dirty = True
+    return len(due)
+
+
+def depth() -> int:
+    return len(_data())
+
+
+def stats() -> dict[str, int]:
+    return {"depth": depth(), **_stats}
+
+
+def flush() -> bool:
+    global _dirty
+    with _lock:
+        if not _dirty or _entries is None:
+            return False
+        snapshot = list(_entries)
+        _dirty = False
+    os.makedirs(os.path.dirname(DEFERRED_FILE), exist_ok=True)
+    tmp_path = f"{DEFERRED_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, DEFERRED_FILE)
+    return True
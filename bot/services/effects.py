@@ -0,0 +1,101 @@
+import logging
+
+import discord
+
+from bot.services import deferred, members, metrics, scheduler, tracing
+from bot.services.role import send_promotion_notification
+
+logger = logging.getLogger(__name__)
+
+# Feedback beyond this is cut from the DM (embed descriptions max out at
+# 4096 characters); the full text stays available through /feedback
+_DM_FEEDBACK_CHARS = 3500
+
+# discord_error of effects held until the gateway is ready (see deferred)
+DEFERRED = "Deferred until the Discord gateway is ready"
+
+
+async def apply_eval_effects(
+    guild_id: int,
+    discord_id: str,
+    old_rank: str,
+    new_rank: str,
+    new_score: int,
+    points: int,
+    feedback: str,
+) -> tuple[bool, str | None]:
+    """Sync the member's role, announce promotions and DM the feedback.
+
+    Returns (promoted, discord_error); Discord failures are reported, not raised.
+    While the guild can't be reached over the gateway (see deferred.ready_guild)
+    the effects are held and replayed later, and discord_error is DEFERRED.
+    """
+    with tracing.span("effects", guild=guild_id, member=discord_id):
+        return await _apply_eval_effects(
+            guild_id, discord_id, old_rank, new_rank, new_score, points, feedback
+        )
+
+
+async def _apply_eval_effects(
+    guild_id: int,
+    discord_id: str,
+    old_rank: str,
+    new_rank: str,
+    new_score: int,
+    points: int,
+    feedback: str,
+) -> tuple[bool, str | None]:
+    guild = deferred.ready_guild(guild_id)
+    if guild is None:
+        deferred.hold(guild_id, discord_id, old_rank, new_rank, new_score, points, feedback)
+        return False, DEFERRED
+
+    promoted = False
+    discord_error = None
+
+    try:
+        # Gateway cache first, then a cached API fetch (misses are cached too)
+        member = await members.resolve(guild, int(discord_id))
+
+        if not member:
+            discord_error = f"Member {discord_id} not found in guild {guild.name}"
+            logger.warning(discord_error)
+        else:
+            await scheduler.set_rank_role(guild, member, new_rank)
+            promoted = old_rank != new_rank
+            if promoted:
+                await send_promotion_notification(guild, member, new_rank)
+
+            # Send DM with feedback
+            try:
+                embed_title = "評価結果"
+                if promoted:
+                    embed_title += f" (昇格: {old_rank} → {new_rank}!)"
+
+                feedback_text = feedback.replace("\\n", "\n")
+                if len(feedback_text) > _DM_FEEDBACK_CHARS:
+                    feedback_text = (
+                        feedback_text[:_DM_FEEDBACK_CHARS]
+                        + "…\n\n(続きはサーバーで `/feedback` を実行すると読めます)"
+                    )
+                embed = discord.Embed(
+                    title=embed_title,
+                    description=(
+                        f"**スコア:** +{points} pt (累積: {new_score} pt)\n"
+                        f"**ランク:** {new_rank}\n\n"
+                        f"**フィードバック:**\n{feedback_text}"
+                    ),
+                    color=discord.Color.green() if promoted else discord.Color.blue(),
+                )
+                await scheduler.send_dm(member, embed=embed)
+            except discord.Forbidden:
+                metrics.DM_FORBIDDEN.inc()
+                logger.info("DM blocked by %s; feedback is still available via /feedback", member)
+    except Exception as e:
+        discord_error = f"{type(e).__name__}: {e}"
+        logger.error("Discord operation failed: %s", discord_error)
+
+    if discord_error:
+        metrics.DISCORD_ERRORS.inc(call="eval_effects")
+
+    return promoted, discord_error
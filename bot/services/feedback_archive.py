@@ -0,0 +1,109 @@
+"""Content-addressed, size-capped store of evaluation feedback.
+
+Each distinct text is zlib-compressed into its own file named after the
+first 64 bits of its SHA-256 (identical feedback is stored once). Reading
+a text touches its file, and once the archive grows past its cap the least
+recently used files are deleted down to 90% of it. Nothing is kept in
+memory but a running size estimate, so the archive can be much larger than
+the process; several processes may share one directory.
+"""
+import hashlib
+import logging
+import os
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+_LOW_WATER = 0.9  # evict down to this share of max_bytes
+
+
+class FeedbackArchive:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: int | None = None  # bytes on disk; scanned on the first put
+
+    @staticmethod
+    def key_of(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+    def _path(self, key: int) -> str:
+        name = f"{key:016x}"
+        return os.path.join(self.root, name[:2], f"{name}.z")
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every stored text."""
+        files = []
+        if not os.path.isdir(self.root):
+            return files
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".z"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue  # evicted by another process meanwhile
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        return files
+
+    def put(self, text: str) -> tuple[int, int]:
+        """Store text; returns (key, compressed length)."""
+        key = self.key_of(text)
+        path = self._path(key)
+        try:
+            os.utime(path)  # already stored: just mark it used
+            return key, os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        blob = zlib.compress(text.encode("utf-8"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += len(blob)
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+        return key, len(blob)
+
+    def _evict(self, keep: str) -> None:
+        # Rescan rather than trust the estimate: other processes write here too
+        files = sorted(self._scan())
+        size = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * _LOW_WATER)
+        evicted = 0
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            if path == keep:
+                continue  # never the text just stored
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            evicted += 1
+        self._size = size
+        logger.info("Evicted %d feedback texts from %s (%d bytes left)", evicted, self.root, size)
+
+    def get(self, key: int) -> str | None:
+        """The stored text, or None once it has been evicted."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return zlib.decompress(blob).decode("utf-8")
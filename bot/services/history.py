@@ -0,0 +1,265 @@
+"""Append-only log of every evaluation applied to the score store.
+
+Events are fixed-width binary records in history.bin; feedback text goes
+to the guild's FeedbackArchive and is referenced by its key (records from
+before the archive point into the zlib-compressed history_feedback.bin
+by offset instead). An
+in-memory index of record numbers per user makes a member's recent
+events reachable without scanning the log. Each guild has its own log.
+
+In split mode several processes append to the same files: writers take an
+flock, and each process indexes records written by the others before
+reading or appending.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: split mode isn't supported there
+    fcntl = None
+
+from bot.config import (
+    GUILD_IDS, HISTORY_FILE, HISTORY_FEEDBACK_FILE, PROCESS_MODE, RANKS,
+    FEEDBACK_DIR, FEEDBACK_ARCHIVE_MAX_BYTES,
+)
+from bot.services.feedback_archive import FeedbackArchive
+from bot.services.storage import guild_path
+
+logger = logging.getLogger(__name__)
+
+# timestamp, discord_id, points, score after, old rank, new rank, eval rank,
+# flags, feedback offset (archive key with FLAG_ARCHIVED), feedback length
+_RECORD = struct.Struct("<dQiiBBBBQI")
+_NO_RANK = 0xFF
+FLAG_SKIP_GRADE = 0x01
+FLAG_RESET = 0x02  # (re-)registration: score starts over from zero
+FLAG_RERANK = 0x04  # rank recomputed after a RANK_THRESHOLDS change, no points
+FLAG_ARCHIVED = 0x08  # feedback lives in the FeedbackArchive
+
+
+@dataclass(frozen=True)
+class ScoreEvent:
+    timestamp: float
+    discord_id: str
+    points: int
+    score: int
+    old_rank: str
+    new_rank: str
+    eval_rank: str | None
+    flags: int
+    feedback_offset: int
+    feedback_length: int
+
+    @property
+    def skip_grade(self) -> bool:
+        return bool(self.flags & FLAG_SKIP_GRADE)
+
+    @property
+    def reset(self) -> bool:
+        return bool(self.flags & FLAG_RESET)
+
+    @property
+    def rerank(self) -> bool:
+        return bool(self.flags & FLAG_RERANK)
+
+    @property
+    def archived(self) -> bool:
+        return bool(self.flags & FLAG_ARCHIVED)
+
+
+def _rank_code(rank: str | None) -> int:
+    return RANKS.index(rank) if rank in RANKS else _NO_RANK
+
+
+def _rank_of(code: int) -> str | None:
+    return RANKS[code] if code != _NO_RANK else None
+
+
+class EventLog:
+    """One guild's event log, feedback archive and legacy feedback file."""
+
+    def __init__(
+        self, path: str, feedback_path: str, archive: FeedbackArchive | None = None,
+        shared: bool = False,
+    ):
+        self.path = path
+        self.feedback_path = feedback_path
+        self.archive = archive
+        self.shared = shared  # other processes append to the same files
+        self._lock = threading.RLock()
+        self._index: dict[str, array] | None = None  # discord_id -> record numbers, oldest first
+        self._records = 0
+        self._feedback_size = 0
+        self._log = None
+        self._feedback_log = None
+
+    def _data(self) -> dict[str, array]:
+        """Open the log files and build the per-user index (once)."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._log = open(self.path, "a+b")
+                    self._feedback_log = open(self.feedback_path, "a+b")
+                    self._index = {}
+                    with self._file_lock():
+                        size = os.path.getsize(self.path)
+                        if size % _RECORD.size:
+                            # Drop a torn record left by a crash mid-write
+                            size -= size % _RECORD.size
+                            self._log.truncate(size)
+                        self._catch_up()
+                        self._feedback_size = os.path.getsize(self.feedback_path)
+                    logger.info(
+                        "Indexed %d score events for %d users in %s",
+                        self._records, len(self._index), self.path,
+                    )
+        return self._index
+
+    def _catch_up(self) -> None:
+        """Index records appended since the last scan (by any process)."""
+        self._log.flush()
+        self._log.seek(self._records * _RECORD.size)
+        while chunk := self._log.read(_RECORD.size * 4096):
+            whole = len(chunk) - len(chunk) % _RECORD.size
+            for fields in _RECORD.iter_unpack(chunk[:whole]):
+                self._index.setdefault(str(fields[1]), array("I")).append(self._records)
+                self._records += 1
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True) -> Iterator[None]:
+        if not self.shared or fcntl is None:
+            yield
+            return
+        fcntl.flock(self._log.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._log.fileno(), fcntl.LOCK_UN)
+
+    def load(self) -> None:
+        self._data()
+
+    def append(
+        self,
+        discord_id: str,
+        points: int,
+        score: int,
+        old_rank: str,
+        new_rank: str,
+        eval_rank: str | None = None,
+        feedback: str | None = None,
+        flags: int = 0,
+    ) -> None:
+        index = self._data()
+        archived = None
+        if feedback and self.archive:
+            archived = self.archive.put(feedback)
+            flags |= FLAG_ARCHIVED
+        with self._lock, self._file_lock():
+            if self.shared:
+                # Other processes may have grown both files since our last write
+                self._catch_up()
+                self._feedback_size = os.fstat(self._feedback_log.fileno()).st_size
+            offset, length = self._feedback_size, 0
+            if archived:
+                offset, length = archived
+            elif feedback:
+                blob = zlib.compress(feedback.encode("utf-8"))
+                self._feedback_log.write(blob)
+                length = len(blob)
+                self._feedback_size += length
+            self._log.write(_RECORD.pack(
+                time.time(), int(discord_id), points, score,
+                _rank_code(old_rank), _rank_code(new_rank), _rank_code(eval_rank),
+                flags, offset, length,
+            ))
+            index.setdefault(discord_id, array("I")).append(self._records)
+            self._records += 1
+            if self.shared:
+                self._feedback_log.flush()
+                self._log.flush()
+
+    def _read(self, recno: int) -> ScoreEvent:
+        self._log.seek(recno * _RECORD.size)
+        ts, did, points, score, old, new, ev, flags, offset, length = _RECORD.unpack(
+            self._log.read(_RECORD.size)
+        )
+        return ScoreEvent(
+            ts, str(did), points, score, _rank_of(old), _rank_of(new), _rank_of(ev),
+            flags, offset, length,
+        )
+
+    def recent(self, discord_id: str, limit: int) -> list[ScoreEvent]:
+        """The user's last `limit` events, newest first."""
+        index = self._data()
+        with self._lock, self._file_lock(exclusive=False):
+            self._catch_up()
+            recnos = index.get(discord_id, array("I"))[-limit:] if limit > 0 else array("I")
+            return [self._read(recno) for recno in reversed(recnos)]
+
+    def events(self, discord_id: str) -> list[ScoreEvent]:
+        """All of the user's events, oldest first."""
+        index = self._data()
+        with self._lock, self._file_lock(exclusive=False):
+            self._catch_up()
+            return [self._read(recno) for recno in index.get(discord_id, ())]
+
+    def feedback(self, event: ScoreEvent) -> str | None:
+        """The event's feedback ("" if it had none, None if it was evicted)."""
+        if not event.feedback_length:
+            return ""
+        if event.archived:
+            return self.archive.get(event.feedback_offset) if self.archive else None
+        self._data()
+        with self._lock:
+            self._feedback_log.flush()
+            self._feedback_log.seek(event.feedback_offset)
+            blob = self._feedback_log.read(event.feedback_length)
+        return zlib.decompress(blob).decode("utf-8")
+
+    def flush(self) -> bool:
+        if self._index is None:
+            return False
+        with self._lock:
+            self._feedback_log.flush()
+            self._log.flush()
+            os.fsync(self._feedback_log.fileno())
+            os.fsync(self._log.fileno())
+        return True
+
+
+_logs: dict[int, EventLog] = {
+    guild_id: EventLog(
+        guild_path(HISTORY_FILE, guild_id),
+        guild_path(HISTORY_FEEDBACK_FILE, guild_id),
+        FeedbackArchive(guild_path(FEEDBACK_DIR, guild_id), FEEDBACK_ARCHIVE_MAX_BYTES),
+        shared=PROCESS_MODE != "all",
+    )
+    for guild_id in GUILD_IDS
+}
+
+
+def for_guild(guild_id: int) -> EventLog:
+    return _logs[guild_id]
+
+
+def load() -> None:
+    for log in _logs.values():
+        log.load()
+
+
+def flush() -> bool:
+    flushed = False
+    for log in _logs.values():
+        flushed = log.flush() or flushed
+    return flushed
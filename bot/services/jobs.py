@@ -0,0 +1,217 @@
+"""Background workers for webhook Discord side effects (accept-and-enqueue mode).
+
+With PROCESS_MODE=api, jobs are published to the durable outbox instead and
+run by the workers of the gateway process, which claim them from there.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from bot.config import (
+    EVAL_JOB_QUEUE_SIZE, EVAL_JOB_WORKERS, EVAL_JOB_HISTORY,
+    OUTBOX_MAX_PENDING, OUTBOX_POLL_INTERVAL, PROCESS_MODE,
+)
+from bot.services import outbox, score as score_service, tracing
+from bot.services.effects import apply_eval_effects
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    id: str
+    guild_id: int
+    discord_id: str
+    old_rank: str
+    new_rank: str
+    score: int
+    points: int
+    feedback: str = field(repr=False)
+    status: str = "queued"  # queued -> running -> done
+    promoted: bool = False
+    discord_error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        del data["feedback"]
+        return data
+
+    def payload(self) -> dict[str, Any]:
+        """What a gateway process needs to run the job."""
+        return {name: getattr(self, name) for name in _PAYLOAD_FIELDS}
+
+
+_PAYLOAD_FIELDS = ("guild_id", "discord_id", "old_rank", "new_rank", "score", "points", "feedback")
+
+
+_queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=EVAL_JOB_QUEUE_SIZE)
+_jobs: OrderedDict[str, Job] = OrderedDict()
+_workers: list[asyncio.Task] = []
+_consumer: asyncio.Task | None = None  # gateway mode: outbox -> _queue
+_PRUNE_INTERVAL = 60.0  # seconds between deletions of old finished outbox rows
+
+
+async def is_full() -> bool:
+    if PROCESS_MODE == "api":
+        # A COUNT(*) that can wait on other workers' write locks; keep it off the loop
+        return await asyncio.to_thread(outbox.depth) >= OUTBOX_MAX_PENDING
+    return _queue.full()
+
+
+def depth() -> int:
+    if PROCESS_MODE == "api":
+        return outbox.depth()
+    return _queue.qsize()
+
+
+def _from_outbox(row: dict[str, Any]) -> Job:
+    job = Job(id=str(row["id"]), **row["payload"])
+    job.status, job.created_at, job.finished_at = row["status"], row["created_at"], row["finished_at"]
+    if row["result"]:
+        job.promoted = row["result"]["promoted"]
+        job.discord_error = row["result"]["discord_error"]
+    return job
+
+
+async def get(job_id: str) -> Job | None:
+    if PROCESS_MODE == "api":
+        row = await asyncio.to_thread(outbox.get, int(job_id)) if job_id.isdigit() else None
+        return _from_outbox(row) if row else None
+    return _jobs.get(job_id)
+
+
+def _remember(job: Job) -> None:
+    _jobs[job.id] = job
+    while len(_jobs) > EVAL_JOB_HISTORY:
+        _jobs.popitem(last=False)
+
+
+async def submit(
+    guild_id: int, discord_id: str, old_rank: str, new_rank: str, score: int, points: int,
+    feedback: str,
+) -> Job:
+    job = Job(
+        id=uuid.uuid4().hex,
+        guild_id=guild_id,
+        discord_id=discord_id,
+        old_rank=old_rank,
+        new_rank=new_rank,
+        score=score,
+        points=points,
+        feedback=feedback,
+    )
+    if PROCESS_MODE == "api":
+        # The outbox row is the job; its ID is what /webhook/jobs/{id} looks up
+        job.id = str(await asyncio.to_thread(outbox.publish, "eval_effects", job.payload()))
+        return job
+    _remember(job)
+    await _queue.put(job)
+    return job
+
+
+async def _worker(n: int) -> None:
+    from_outbox = PROCESS_MODE == "gateway"
+    while True:
+        job = await _queue.get()
+        job.status = "running"
+        try:
+            with tracing.trace("job.eval_effects", job=job.id):
+                if from_outbox:
+                    # The score was written by an API worker; pick it up for the leaderboard
+                    await asyncio.to_thread(score_service.refresh_index, job.guild_id, job.discord_id)
+                job.promoted, job.discord_error = await apply_eval_effects(
+                    job.guild_id, job.discord_id, job.old_rank, job.new_rank, job.score, job.points,
+                    job.feedback,
+                )
+        except Exception as e:
+            job.discord_error = f"{type(e).__name__}: {e}"
+            logger.exception("Job %s failed in worker %d", job.id, n)
+        finally:
+            job.status = "done"
+            job.finished_at = time.time()
+            if from_outbox:
+                try:
+                    await asyncio.to_thread(
+                        outbox.complete, int(job.id),
+                        {"promoted": job.promoted, "discord_error": job.discord_error},
+                    )
+                except Exception:
+                    logger.exception("Could not mark outbox job %s done", job.id)
+            _queue.task_done()
+
+
+async def _consume_outbox() -> None:
+    """Gateway mode: move jobs published by API workers onto the local queue."""
+    from bot.state import bot
+
+    await asyncio.to_thread(outbox.requeue_running)
+    pruned_at = 0.0
+    while True:
+        try:
+            if not bot.is_ready():
+                # Effects would only be held locally; leave them in the outbox
+                await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+                continue
+            # Claim only what the local queue can hold; the rest stays durable
+            room = EVAL_JOB_QUEUE_SIZE - _queue.qsize()
+            claimed = []
+            if room > 0:
+                claimed = await asyncio.to_thread(outbox.claim, min(room, EVAL_JOB_WORKERS * 4))
+            if not claimed:
+                if time.monotonic() - pruned_at > _PRUNE_INTERVAL:
+                    pruned_at = time.monotonic()
+                    await asyncio.to_thread(outbox.prune, EVAL_JOB_HISTORY)
+                await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+                continue
+            for row_id, kind, payload in claimed:
+                if kind != "eval_effects":
+                    logger.error("Skipping outbox job %d of unknown kind %r", row_id, kind)
+                    await asyncio.to_thread(
+                        outbox.complete, row_id,
+                        {"promoted": False, "discord_error": f"Unknown job kind {kind!r}"},
+                    )
+                    continue
+                job = Job(id=str(row_id), **payload)
+                _remember(job)
+                await _queue.put(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Outbox polling failed")
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+
+def start(workers: int = EVAL_JOB_WORKERS) -> None:
+    global _consumer
+    if PROCESS_MODE == "api":
+        return  # the gateway process runs the jobs
+    for n in range(workers):
+        _workers.append(asyncio.create_task(_worker(n)))
+    if PROCESS_MODE == "gateway":
+        _consumer = asyncio.create_task(_consume_outbox())
+    logger.info("Started %d eval job workers", workers)
+
+
+async def stop(timeout: float = 10.0) -> None:
+    """Give queued jobs a chance to finish, then cancel the workers.
+
+    In gateway mode, jobs still queued stay "running" in the outbox and are
+    requeued on the next start.
+    """
+    global _consumer
+    if _consumer:
+        _consumer.cancel()
+        _consumer = None
+    try:
+        await asyncio.wait_for(_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Stopping with %d eval jobs still queued", _queue.qsize())
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
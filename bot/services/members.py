@@ -0,0 +1,67 @@
+"""Member lookups that avoid repeated REST calls.
+
+guild.get_member only sees the gateway cache; on a miss we fetch once and
+remember the result, including "not in guild", for a short TTL. Entries
+are dropped on member join/remove/update events.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+from bot.config import MEMBER_CACHE_SIZE, MEMBER_CACHE_TTL, MEMBER_NEGATIVE_TTL
+from bot.services import metrics, tracing
+
+# (guild_id, member_id) -> (expires_at, member or None if not in guild)
+_cache: OrderedDict[tuple[int, int], tuple[float, discord.Member | None]] = OrderedDict()
+_inflight: dict[tuple[int, int], asyncio.Future] = {}
+
+
+def invalidate(guild_id: int, member_id: int) -> None:
+    _cache.pop((guild_id, member_id), None)
+
+
+def _remember(key: tuple[int, int], member: discord.Member | None) -> None:
+    ttl = MEMBER_CACHE_TTL if member else MEMBER_NEGATIVE_TTL
+    _cache.pop(key, None)
+    _cache[key] = (time.monotonic() + ttl, member)
+    while len(_cache) > MEMBER_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def resolve(guild: discord.Guild, member_id: int) -> discord.Member | None:
+    """Return the member, or None if they aren't in the guild."""
+    member = guild.get_member(member_id)
+    if member:
+        metrics.MEMBER_LOOKUPS.inc(result="gateway")
+        return member
+
+    key = (guild.id, member_id)
+    entry = _cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        _cache.move_to_end(key)
+        metrics.MEMBER_LOOKUPS.inc(result="hit" if entry[1] else "negative_hit")
+        return entry[1]
+
+    # Share one fetch between concurrent lookups for the same member
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key])
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        metrics.MEMBER_LOOKUPS.inc(result="fetch")
+        try:
+            with metrics.DISCORD_LATENCY.time(call="fetch_member"), tracing.span("discord.fetch_member"):
+                member = await guild.fetch_member(member_id)
+        except discord.NotFound:
+            member = None
+        _remember(key, member)
+        future.set_result(member)
+        return member
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody is waiting
+        raise
+    finally:
+        del _inflight[key]
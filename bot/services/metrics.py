@@ -0,0 +1,187 @@
+"""Minimal Prometheus text-format metrics (no client library needed)."""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+_registry: list["_Metric"] = []
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labels)
+
+    @abstractmethod
+    def _samples(self) -> Iterator[str]: ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time.
+
+    The callback returns a number, or {label values: number} for labelled gauges.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._fn = fn
+
+    def _samples(self) -> Iterator[str]:
+        value = self._fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, v in items:
+            if v is None or (isinstance(v, float) and math.isnan(v)):
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[LabelValues, list] = {}  # key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+WEBHOOK_LATENCY = Histogram(
+    "git_eval_webhook_seconds", "End-to-end webhook handling time", ("endpoint",)
+)
+WEBHOOK_RESPONSES = Counter(
+    "git_eval_webhook_responses_total", "Webhook responses by status code", ("endpoint", "status")
+)
+WEBHOOK_RATE_LIMITED = Counter(
+    "git_eval_webhook_rate_limited_total", "Webhook requests/evaluations rejected by a rate limit",
+    ("limit",),
+)
+SIGNATURE_LATENCY = Histogram(
+    "git_eval_signature_verify_seconds", "HMAC signature verification time",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01),
+)
+SPAN_LATENCY = Histogram(
+    "git_eval_span_seconds", "Time per traced step of requests, commands and jobs", ("span",)
+)
+STORE_LATENCY = Histogram(
+    "git_eval_store_seconds", "Score store operation time", ("op",)
+)
+DISCORD_LATENCY = Histogram(
+    "git_eval_discord_call_seconds", "Discord REST call time", ("call",)
+)
+DISCORD_ERRORS = Counter(
+    "git_eval_discord_errors_total", "Failed Discord operations", ("call",)
+)
+DISCORD_RATE_LIMITS = Counter(
+    "git_eval_discord_rate_limits_total", "429 responses seen from Discord"
+)
+PROMOTIONS = Counter("git_eval_promotions_total", "Rank promotions", ("rank",))
+SKIP_GRADES = Counter("git_eval_skip_grades_total", "Skip-grade jumps", ("rank",))
+DEFERRED_DROPPED = Counter(
+    "git_eval_deferred_dropped_total", "Held Discord side effects dropped before replay (overflow, expired)",
+    ("reason",),
+)
+DM_FORBIDDEN = Counter("git_eval_dm_forbidden_total", "Feedback DMs blocked by the member")
+MEMBER_LOOKUPS = Counter(
+    "git_eval_member_lookups_total", "Member lookups by outcome (gateway, hit, negative_hit, fetch)",
+    ("result",),
+)
@@ -0,0 +1,143 @@
+"""Durable queue of Discord work between API workers and the gateway process.
+
+In split mode (PROCESS_MODE=api/gateway) webhook workers persist the score
+change and publish the job here; the single gateway process claims jobs in
+order, runs them and stores the result so any worker can report it. Rows
+left "running" by a crashed gateway are requeued on its next start.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from bot.config import OUTBOX_FILE
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind        TEXT NOT NULL,
+        payload     TEXT NOT NULL,
+        status      TEXT NOT NULL DEFAULT 'queued',
+        result      TEXT,
+        created_at  REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, id);
+"""
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.RLock()
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        with _lock:
+            if _conn is None:
+                os.makedirs(os.path.dirname(OUTBOX_FILE), exist_ok=True)
+                conn = sqlite3.connect(OUTBOX_FILE, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                _conn = conn
+    return _conn
+
+
+def publish(kind: str, payload: dict[str, Any]) -> int:
+    """Append a job; returns its ID."""
+    with _lock:
+        cursor = _db().execute(
+            "INSERT INTO outbox (kind, payload, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+    return cursor.lastrowid
+
+
+def claim(limit: int) -> list[tuple[int, str, dict[str, Any]]]:
+    """Mark up to `limit` of the oldest queued jobs running and return (id, kind, payload)."""
+    with _lock:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, kind, payload FROM outbox WHERE status = 'queued' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'running' WHERE id = ?", [(row[0],) for row in rows]
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return [(row_id, kind, json.loads(payload)) for row_id, kind, payload in rows]
+
+
+def complete(job_id: int, result: dict[str, Any]) -> None:
+    with _lock:
+        _db().execute(
+            "UPDATE outbox SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id),
+        )
+
+
+def requeue_running() -> int:
+    """Put jobs claimed by a previous gateway run back in the queue."""
+    with _lock:
+        count = _db().execute(
+            "UPDATE outbox SET status = 'queued' WHERE status = 'running'"
+        ).rowcount
+    if count:
+        logger.warning("Requeued %d outbox jobs left running by a previous gateway", count)
+    return count
+
+
+def get(job_id: int) -> dict[str, Any] | None:
+    with _lock:
+        row = _db().execute(
+            "SELECT kind, payload, status, result, created_at, finished_at FROM outbox WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    if not row:
+        return None
+    kind, payload, status, result, created_at, finished_at = row
+    return {
+        "id": job_id,
+        "kind": kind,
+        "payload": json.loads(payload),
+        "status": status,
+        "result": json.loads(result) if result else None,
+        "created_at": created_at,
+        "finished_at": finished_at,
+    }
+
+
+def depth() -> int:
+    """Jobs not finished yet (queued or running)."""
+    with _lock:
+        return _db().execute(
+            "SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+
+
+def prune(keep: int) -> int:
+    """Delete finished jobs except the newest `keep`."""
+    with _lock:
+        return _db().execute(
+            "DELETE FROM outbox WHERE status = 'done' AND id NOT IN "
+            "(SELECT id FROM outbox WHERE status = 'done' ORDER BY id DESC LIMIT ?)",
+            (keep,),
+        ).rowcount
+
+
+def close() -> None:
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
@@ -0,0 +1,102 @@
+"""Opt-in sampling profiler that can be switched on and off at runtime.
+
+A daemon thread samples the stacks of every other thread each
+PROFILE_INTERVAL seconds and counts them. Stopping writes the counts as
+folded stacks (flamegraph.pl / speedscope input) to PROFILES_DIR.
+Toggle with /profiler in Discord or SIGUSR2 to the process.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from bot.config import PROFILES_DIR, PROFILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+_stacks: Counter[str] = Counter()
+_started_at = 0.0
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _sample(interval: float) -> None:
+    me = threading.get_ident()
+    while not _stop.wait(interval):
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            _stacks[";".join(reversed(names))] += 1
+
+
+def running() -> bool:
+    return _thread is not None
+
+
+def start(interval: float = PROFILE_INTERVAL) -> bool:
+    """Start sampling; False if already running."""
+    global _thread, _started_at
+    with _lock:
+        if _thread is not None:
+            return False
+        _stacks.clear()
+        _stop.clear()
+        _started_at = time.time()
+        _thread = threading.Thread(target=_sample, args=(interval,), name="profiler", daemon=True)
+        _thread.start()
+    logger.info("Sampling profiler started (every %.0f ms)", interval * 1000)
+    return True
+
+
+def stop() -> str | None:
+    """Stop sampling and write the folded stacks; returns the file path."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            return None
+        _stop.set()
+        _thread.join()
+        _thread = None
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        path = os.path.join(PROFILES_DIR, time.strftime("%Y%m%d-%H%M%S.folded", time.localtime(_started_at)))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in _stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    logger.info("Sampling profiler stopped: %d samples written to %s", sum(_stacks.values()), path)
+    return path
+
+
+def toggle() -> str | None:
+    """Start if stopped, else stop (returns the profile path when stopping)."""
+    if running():
+        return stop()
+    start()
+    return None
+
+
+def top(limit: int = 10) -> list[tuple[str, int]]:
+    """Functions seen on top of the sampled stacks most often so far."""
+    leaves: Counter[str] = Counter()
+    for stack, count in list(_stacks.items()):
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(limit)
+
+
+def stats() -> dict:
+    return {
+        "running": running(),
+        "samples": sum(_stacks.values()),
+        "seconds": round(time.time() - _started_at, 1) if running() else None,
+    }
@@ -0,0 +1,69 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Iterable
+
+
+class ScoreIndex:
+    """Users sorted by score, maintained incrementally.
+
+    Lookups are O(log n); a page of k entries is O(log n + k).
+    """
+
+    def __init__(self, users: Iterable[tuple[str, int, str]] = ()):
+        self._keys: list[tuple[int, str]] = []  # (-score, discord_id), best first
+        self._entries: dict[str, tuple[int, str]] = {}  # discord_id -> (score, rank)
+        self._rank_counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        for discord_id, score, rank in users:
+            self._entries[discord_id] = (score, rank)
+            self._rank_counts[rank] += 1
+        self._keys = sorted((-score, did) for did, (score, _) in self._entries.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _remove(self, discord_id: str) -> None:
+        entry = self._entries.pop(discord_id, None)
+        if entry is None:
+            return
+        score, rank = entry
+        i = bisect_left(self._keys, (-score, discord_id))
+        del self._keys[i]
+        self._rank_counts[rank] -= 1
+        if not self._rank_counts[rank]:
+            del self._rank_counts[rank]
+
+    def update(self, discord_id: str, score: int, rank: str) -> None:
+        with self._lock:
+            if self._entries.get(discord_id) == (score, rank):
+                return
+            self._remove(discord_id)
+            self._entries[discord_id] = (score, rank)
+            insort(self._keys, (-score, discord_id))
+            self._rank_counts[rank] += 1
+
+    def remove(self, discord_id: str) -> None:
+        with self._lock:
+            self._remove(discord_id)
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, str, int, str]]:
+        """Return [(position, discord_id, score, rank)] starting at offset (0-based)."""
+        with self._lock:
+            rows = []
+            for neg_score, did in self._keys[offset:offset + limit]:
+                position = bisect_left(self._keys, (neg_score, "")) + 1
+                rows.append((position, did, -neg_score, self._entries[did][1]))
+            return rows
+
+    def position(self, discord_id: str) -> int | None:
+        """1-based standing; users with equal scores share a position."""
+        with self._lock:
+            entry = self._entries.get(discord_id)
+            if entry is None:
+                return None
+            return bisect_left(self._keys, (-entry[0], "")) + 1
+
+    def rank_counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._rank_counts)
@@ -0,0 +1,41 @@
+"""Token-bucket rate limits for the webhook API.
+
+Each key (client IP, GitHub username) gets a bucket of `burst` tokens
+refilled at `rate` per second; a request spends one. Buckets live in this
+process only, so with PROCESS_MODE=api each worker enforces the limits on
+the requests it serves. The least recently used keys beyond max_keys are
+forgotten (which refills them).
+"""
+import time
+from collections import OrderedDict
+
+from bot.config import RATE_LIMIT_MAX_KEYS
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate  # tokens per second; 0 disables the limit
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+        # key -> (tokens left, when they were counted); least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Spend a token for key. Returns 0 if allowed, else seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, counted_at = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - counted_at) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,102 @@
+"""Bring members' Discord rank roles back in line with the score store."""
+import asyncio
+import logging
+import time
+from typing import Any
+
+import discord
+
+from bot.config import RANKS, RECONCILE_CONCURRENCY
+from bot.services import members, scheduler, score as score_service
+from bot.services.role import ROLE_PREFIX, get_or_create_rank_role
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_roles(guild: discord.Guild) -> dict[str, Any]:
+    """Diff every registered user's rank against their roles and fix only the differences.
+
+    Uses the cached member list; returns counts and elapsed seconds.
+    """
+    started = time.monotonic()
+    if not guild.chunked:
+        await guild.chunk()
+    users = await asyncio.to_thread(lambda: list(score_service.iter_users(guild.id)))
+    role_ids = {}
+    for rank in {user["rank"] for _, user in users}:
+        role_ids[rank] = (await get_or_create_rank_role(guild, rank)).id
+
+    counts = {"users": len(users), "in_sync": 0, "updated": 0, "missing": 0, "failed": 0}
+    slots = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def fix(member: discord.Member, rank: str) -> None:
+        try:
+            await scheduler.set_rank_role(guild, member, rank)
+            counts["updated"] += 1
+        except discord.HTTPException as e:
+            counts["failed"] += 1
+            logger.warning("Reconcile failed for %s: %s", member, e)
+        finally:
+            slots.release()
+
+    tasks = []
+    for discord_id, user in users:
+        member = guild.get_member(int(discord_id))
+        if not member:
+            counts["missing"] += 1
+            continue
+        current = {r.id for r in member.roles if r.name.startswith(ROLE_PREFIX)}
+        if current == {role_ids[user["rank"]]}:
+            counts["in_sync"] += 1
+            continue
+        await slots.acquire()
+        tasks.append(asyncio.create_task(fix(member, user["rank"])))
+    await asyncio.gather(*tasks)
+
+    counts["seconds"] = round(time.monotonic() - started, 3)
+    logger.info("Role reconciliation for %s: %s", guild.name, counts)
+    return counts
+
+
+async def rerank_guild(guild: discord.Guild, dry_run: bool = False) -> dict[str, Any]:
+    """Re-rank every stored user against RANK_THRESHOLDS and move only the changed roles.
+
+    Role edits go through the Discord scheduler, RECONCILE_CONCURRENCY at a time.
+    """
+    started = time.monotonic()
+    changes = await asyncio.to_thread(score_service.rerank, guild.id, dry_run)
+    counts = {
+        "changed": len(changes),
+        "promoted": sum(RANKS.index(new) > RANKS.index(old) for _, old, new, _ in changes),
+        "demoted": sum(RANKS.index(new) < RANKS.index(old) for _, old, new, _ in changes),
+        "updated": 0, "missing": 0, "failed": 0,
+    }
+    if dry_run:
+        counts["seconds"] = round(time.monotonic() - started, 3)
+        return counts
+
+    slots = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def move(discord_id: str, rank: str) -> None:
+        try:
+            member = await members.resolve(guild, int(discord_id))
+            if not member:
+                counts["missing"] += 1
+                return
+            await scheduler.set_rank_role(guild, member, rank)
+            counts["updated"] += 1
+        except discord.HTTPException as e:
+            counts["failed"] += 1
+            logger.warning("Re-rank role update failed for %s: %s", discord_id, e)
+        finally:
+            slots.release()
+
+    tasks = []
+    for discord_id, _, new_rank, _ in changes:
+        await slots.acquire()
+        tasks.append(asyncio.create_task(move(discord_id, new_rank)))
+    await asyncio.gather(*tasks)
+
+    counts["seconds"] = round(time.monotonic() - started, 3)
+    logger.info("Re-rank for %s: %s", guild.name, counts)
+    return counts
@@ -1,71 +1,200 @@
+import asyncio
 import logging
 
 import discord
 
-from bot.config import RANKS, RANK_NAMES, NOTIFICATION_CHANNEL_ID
+from bot.config import RANKS, RANK_NAMES, NOTIFICATION_CHANNEL_IDS, PROMOTION_BATCH_SECONDS
+from bot.services import members, scheduler
 
 logger = logging.getLogger(__name__)
 
 
+ROLE_PREFIX = "Git-Eval:"
+
+# guild_id -> rank -> role ID; rebuilt on role create/update/delete events
+_role_ids: dict[int, dict[str, int]] = {}
+
+
 def _role_name(rank: str) -> str:
-    return f"Git-Eval: {rank} ({RANK_NAMES[rank]})"
+    return f"{ROLE_PREFIX} {rank} ({RANK_NAMES[rank]})"
 
 
-async def ensure_role(guild: discord.Guild, member: discord.Member, rank: str) -> None:
-    """Ensure member has the correct rank role (add if missing)."""
-    role_name = _role_name(rank)
-    role = discord.utils.get(guild.roles, name=role_name)
-    if not role:
-        role = await guild.create_role(name=role_name)
-        logger.info("Created role: %s", role_name)
-    if role not in member.roles:
-        await member.add_roles(role)
-        logger.info("Ensured role %s for %s", role_name, member)
+_RANK_BY_ROLE_NAME: dict[str, str] = {_role_name(rank): rank for rank in RANKS}
 
 
-async def update_role(guild: discord.Guild, member: discord.Member, old_rank: str, new_rank: str) -> bool:
-    """Update member's rank role. Returns True if rank actually changed."""
-    if old_rank == new_rank:
-        # Even if rank didn't change, ensure member has the role
-        await ensure_role(guild, member, new_rank)
-        return False
+def refresh_role_cache(guild: discord.Guild) -> dict[str, int]:
+    ids = {
+        _RANK_BY_ROLE_NAME[role.name]: role.id
+        for role in guild.roles
+        if role.name in _RANK_BY_ROLE_NAME
+    }
+    _role_ids[guild.id] = ids
+    return ids
 
-    old_role_name = _role_name(old_rank)
-    new_role_name = _role_name(new_rank)
 
-    # Remove old rank role
-    old_role = discord.utils.get(guild.roles, name=old_role_name)
-    if old_role and old_role in member.roles:
-        await member.remove_roles(old_role)
-        logger.info("Removed role %s from %s", old_role_name, member)
+def get_rank_role(guild: discord.Guild, rank: str) -> discord.Role | None:
+    ids = _role_ids.get(guild.id)
+    if ids is None:
+        ids = refresh_role_cache(guild)
+    role_id = ids.get(rank)
+    return guild.get_role(role_id) if role_id else None
 
-    # Add new rank role (create if missing)
-    new_role = discord.utils.get(guild.roles, name=new_role_name)
-    if not new_role:
-        new_role = await guild.create_role(name=new_role_name)
-        logger.info("Created role: %s", new_role_name)
-    await member.add_roles(new_role)
-    logger.info("Assigned role %s to %s", new_role_name, member)
 
-    return True
+async def get_or_create_rank_role(guild: discord.Guild, rank: str) -> discord.Role:
+    role = get_rank_role(guild, rank)
+    if not role:
+        role = await guild.create_role(name=_role_name(rank))
+        _role_ids.setdefault(guild.id, {})[rank] = role.id
+        logger.info("Created role: %s", role.name)
+    return role
+
+
+async def ensure_rank_roles(guild: discord.Guild) -> None:
+    """Create any rank roles missing from the guild."""
+    refresh_role_cache(guild)
+    for rank in RANKS:
+        await get_or_create_rank_role(guild, rank)
+
+
+async def set_rank_role(guild: discord.Guild, member: discord.Member, rank: str) -> None:
+    """Make rank the member's only Git-Eval role.
+
+    Only rank roles are added and removed, never the whole role list, so a
+    member fetched a while ago (see members) can't drop roles granted since.
+    """
+    target = await get_or_create_rank_role(guild, rank)
+    stale = [r for r in member.roles if r.name.startswith(ROLE_PREFIX) and r.id != target.id]
+    missing = all(r.id != target.id for r in member.roles)
+    if not stale and not missing:
+        return
+    reason = f"Git-Eval rank {rank}"
+    if missing:
+        await member.add_roles(target, reason=reason)
+    if stale:
+        await member.remove_roles(*stale, reason=reason)
+    # A fetched copy's roles are out of date now
+    members.invalidate(guild.id, member.id)
+    logger.info("Set rank role %s for %s", target.name, member)
+
+
+# guild_id -> member_id -> (mention, new_rank), announced together per window
+_pending_promotions: dict[int, dict[int, tuple[str, str]]] = {}
+_promotion_timers: dict[int, asyncio.Task] = {}
+
+# Discord embed limits
+_FIELD_VALUE_LIMIT = 1024
+_EMBED_FIELD_LIMIT = 25
+_EMBED_TOTAL_LIMIT = 6000
+
+
+def _notification_channel(guild: discord.Guild) -> discord.TextChannel | None:
+    channel_id = NOTIFICATION_CHANNEL_IDS.get(guild.id)
+    if not channel_id:
+        logger.warning("No notification channel set for guild %s, skipping notification", guild.id)
+        return None
+    channel = guild.get_channel(channel_id)
+    if not channel or not isinstance(channel, discord.TextChannel):
+        logger.warning("Channel %s not found or not a text channel", channel_id)
+        return None
+    return channel
 
 
 async def send_promotion_notification(
     guild: discord.Guild, member: discord.Member, new_rank: str
 ) -> None:
-    if not NOTIFICATION_CHANNEL_ID:
-        logger.warning("NOTIFICATION_CHANNEL_ID not set, skipping notification")
+    channel = _notification_channel(guild)
+    if not channel:
         return
-    channel = guild.get_channel(NOTIFICATION_CHANNEL_ID)
-    if not channel or not isinstance(channel, discord.TextChannel):
-        logger.warning("Channel %s not found or not a text channel", NOTIFICATION_CHANNEL_ID)
+
+    if PROMOTION_BATCH_SECONDS > 0:
+        pending = _pending_promotions.setdefault(guild.id, {})
+        pending.pop(member.id, None)  # keep only the latest rank, in arrival order
+        pending[member.id] = (member.mention, new_rank)
+        if guild.id not in _promotion_timers:
+            _promotion_timers[guild.id] = asyncio.create_task(_announce_later(guild))
         return
-    logger.info("Sending promotion notification to #%s", channel.name)
 
+    logger.info("Sending promotion notification to #%s", channel.name)
     rank_label = f"{new_rank} ({RANK_NAMES[new_rank]})"
     embed = discord.Embed(
         title="Rank Up!",
         description=f"{member.mention} さんが **{rank_label}** ランクに昇格しました!",
         color=discord.Color.gold(),
     )
-    await channel.send(embed=embed)
+    await scheduler.send_message(channel, embed=embed)
+
+
+def _promotion_embeds(promotions: list[tuple[str, str]]) -> list[discord.Embed]:
+    """One field per rank (split at the field value limit), packed into as few embeds as fit."""
+    fields: list[tuple[str, str]] = []
+    for rank in reversed(RANKS):
+        mentions = [mention for mention, r in promotions if r == rank]
+        value = ""
+        for mention in mentions:
+            if value and len(value) + 1 + len(mention) > _FIELD_VALUE_LIMIT:
+                fields.append((f"{rank} ({RANK_NAMES[rank]})", value))
+                value = ""
+            value = f"{value} {mention}" if value else mention
+        if value:
+            fields.append((f"{rank} ({RANK_NAMES[rank]})", value))
+
+    description = f"{len(promotions)} 人が昇格しました!"
+    embeds: list[discord.Embed] = []
+    for name, value in fields:
+        embed = embeds[-1] if embeds else None
+        if (
+            embed is None
+            or len(embed.fields) >= _EMBED_FIELD_LIMIT
+            or len(embed) + len(name) + len(value) > _EMBED_TOTAL_LIMIT
+        ):
+            embed = discord.Embed(title="Rank Up!", description=description, color=discord.Color.gold())
+            embeds.append(embed)
+        embed.add_field(name=name, value=value, inline=False)
+    if len(embeds) > 1:
+        for i, embed in enumerate(embeds, 1):
+            embed.title = f"Rank Up! ({i}/{len(embeds)})"
+    return embeds
+
+
+async def _announce_later(guild: discord.Guild) -> None:
+    try:
+        await asyncio.sleep(PROMOTION_BATCH_SECONDS)
+    finally:
+        _promotion_timers.pop(guild.id, None)
+    await _announce(guild)
+
+
+async def _announce(guild: discord.Guild) -> None:
+    promotions = list(_pending_promotions.pop(guild.id, {}).values())
+    channel = _notification_channel(guild)
+    if not promotions or not channel:
+        return
+    if len(promotions) == 1:
+        mention, rank = promotions[0]
+        rank_label = f"{rank} ({RANK_NAMES[rank]})"
+        embeds = [discord.Embed(
+            title="Rank Up!",
+            description=f"{mention} さんが **{rank_label}** ランクに昇格しました!",
+            color=discord.Color.gold(),
+        )]
+    else:
+        embeds = _promotion_embeds(promotions)
+    logger.info("Announcing %d promotion(s) to #%s", len(promotions), channel.name)
+    for embed in embeds:
+        try:
+            await scheduler.send_message(channel, embed=embed)
+        except Exception:
+            logger.exception("Failed to send promotion announcement")
+
+
+async def flush_promotions() -> None:
+    """Announce pending promotions now (used on shutdown)."""
+    from bot.state import bot
+
+    for task in list(_promotion_timers.values()):
+        task.cancel()
+    _promotion_timers.clear()
+    for guild_id in list(_pending_promotions):
+        guild = bot.get_guild(guild_id)
+        if guild:
+            await _announce(guild)
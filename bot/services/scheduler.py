@@ -0,0 +1,177 @@
+"""Central scheduler for outbound Discord writes.
+
+Role edits, channel posts and DMs wait in separate lanes and are
+dispatched in that priority order with a bounded number of requests in
+flight. A pending role change for a member is replaced by newer ones, so
+only the final rank is sent. Full lanes make submitters wait.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+import discord
+
+from bot.config import DISCORD_MAX_IN_FLIGHT, DISCORD_LANE_SIZE
+from bot.services import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Action:
+    factory: Callable[[], Awaitable[Any]]
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+class _Lane:
+    def __init__(self, name: str, call: str, maxsize: int):
+        self.name = name
+        self.call = call  # metrics label
+        self.pending: OrderedDict[Hashable, _Action] = OrderedDict()
+        self.active: set[Hashable] = set()  # keys currently in flight
+        self.room = asyncio.Semaphore(maxsize)
+
+
+_roles = _Lane("roles", "role_edit", DISCORD_LANE_SIZE)
+_posts = _Lane("posts", "channel_send", DISCORD_LANE_SIZE)
+_dms = _Lane("dms", "dm", DISCORD_LANE_SIZE)
+_LANES = [_roles, _posts, _dms]  # priority order
+
+_slots = asyncio.Semaphore(DISCORD_MAX_IN_FLIGHT)
+_wakeup = asyncio.Event()
+_dispatcher: asyncio.Task | None = None
+_ids = itertools.count()
+_stats = {"completed": 0, "failed": 0, "coalesced": 0, "rate_limited": 0}
+
+
+class _RateLimitCounter(logging.Filter):
+    """Counts the 429s that discord.py retries internally."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if "429" in str(record.msg):
+            _stats["rate_limited"] += 1
+            metrics.DISCORD_RATE_LIMITS.inc()
+        return True
+
+
+logging.getLogger("discord.http").addFilter(_RateLimitCounter())
+
+
+def stats() -> dict[str, Any]:
+    return {
+        "queues": {lane.name: len(lane.pending) for lane in _LANES},
+        "in_flight": sum(len(lane.active) for lane in _LANES),
+        **_stats,
+    }
+
+
+def depth() -> int:
+    return sum(len(lane.pending) for lane in _LANES)
+
+
+def _pick() -> tuple[_Lane, Hashable, _Action] | None:
+    for lane in _LANES:
+        for key in lane.pending:
+            # Never run two actions for the same key at once
+            if key not in lane.active:
+                action = lane.pending.pop(key)
+                lane.active.add(key)
+                lane.room.release()
+                return lane, key, action
+    return None
+
+
+async def _dispatch() -> None:
+    while True:
+        await _slots.acquire()
+        while (picked := _pick()) is None:
+            _wakeup.clear()
+            await _wakeup.wait()
+        asyncio.create_task(_run(*picked))
+
+
+async def _run(lane: _Lane, key: Hashable, action: _Action) -> None:
+    started = time.perf_counter()
+    try:
+        result = await action.factory()
+    except Exception as e:
+        _stats["failed"] += 1
+        metrics.DISCORD_ERRORS.inc(call=lane.call)
+        if isinstance(e, discord.HTTPException) and e.status == 429:
+            _stats["rate_limited"] += 1
+            metrics.DISCORD_RATE_LIMITS.inc()
+        for future in action.futures:
+            if not future.done():
+                future.set_exception(e)
+    else:
+        _stats["completed"] += 1
+        for future in action.futures:
+            if not future.done():
+                future.set_result(result)
+    finally:
+        metrics.DISCORD_LATENCY.observe(time.perf_counter() - started, call=lane.call)
+        lane.active.discard(key)
+        _slots.release()
+        _wakeup.set()
+
+
+def start() -> None:
+    global _dispatcher
+    if _dispatcher is None or _dispatcher.done():
+        _dispatcher = asyncio.create_task(_dispatch())
+
+
+async def stop(timeout: float = 10.0) -> None:
+    """Wait briefly for queued actions to drain, then stop dispatching."""
+    global _dispatcher
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while (depth() or stats()["in_flight"]) and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    if _dispatcher:
+        _dispatcher.cancel()
+        _dispatcher = None
+
+
+async def _submit(lane: _Lane, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    # Time spent queued plus the call itself, as seen by the submitter
+    with tracing.span(f"discord.{lane.call}"):
+        return await _enqueue(lane, key, factory)
+
+
+async def _enqueue(lane: _Lane, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    start()
+    future = asyncio.get_running_loop().create_future()
+    action = lane.pending.get(key)
+    if action is None:
+        await lane.room.acquire()
+        action = lane.pending.get(key)  # may have appeared while we waited
+        if action is None:
+            lane.pending[key] = _Action(factory, [future])
+            _wakeup.set()
+            return await future
+        lane.room.release()
+    # Supersede the queued action; everyone waiting gets the final result
+    action.factory = factory
+    action.futures.append(future)
+    _stats["coalesced"] += 1
+    _wakeup.set()
+    return await future
+
+
+async def set_rank_role(guild: discord.Guild, member: discord.Member, rank: str) -> None:
+    from bot.services.role import set_rank_role as _set_rank_role
+
+    await _submit(_roles, (guild.id, member.id), lambda: _set_rank_role(guild, member, rank))
+
+
+async def send_message(channel: discord.abc.Messageable, **kwargs: Any) -> discord.Message:
+    return await _submit(_posts, next(_ids), lambda: channel.send(**kwargs))
+
+
+async def send_dm(member: discord.abc.User, **kwargs: Any) -> discord.Message:
+    return await _submit(_dms, next(_ids), lambda: member.send(**kwargs))
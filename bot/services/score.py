@@ -1,53 +1,146 @@
-import json
-import os
-from typing import Any
+import logging
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
 
-from bot.config import USERS_FILE, RANKS, RANK_THRESHOLDS
+from bot.config import (
+    GUILD_IDS, USERS_FILE, SQLITE_FILE, STORAGE_BACKEND, RANKS, RANK_THRESHOLDS,
+)
+from bot.services import history, metrics, tracing
+from bot.services.ranking import ScoreIndex
+from bot.services.storage import Storage, guild_path, open_storage
 
+logger = logging.getLogger(__name__)
 
-def _load_users() -> dict[str, Any]:
-    if not os.path.exists(USERS_FILE):
-        return {}
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+class _Partition:
+    """One guild's users: its own store, write lock and leaderboard index."""
 
-def _save_users(data: dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.storage: Storage = open_storage(
+            STORAGE_BACKEND, guild_path(USERS_FILE, guild_id), guild_path(SQLITE_FILE, guild_id)
+        )
+        self.history = history.for_guild(guild_id)
+        self.lock = threading.RLock()  # serializes read-modify-write of user records
+        self._index: ScoreIndex | None = None  # built on first leaderboard query
 
+    def ranking(self) -> ScoreIndex:
+        if self._index is None:
+            with self.lock:
+                if self._index is None:
+                    self._index = ScoreIndex(
+                        (did, user["score"], user["rank"]) for did, user in self.storage.iter_users()
+                    )
+        return self._index
 
-def get_user(discord_id: str) -> dict[str, Any] | None:
-    users = _load_users()
-    return users.get(discord_id)
+    def reindex(self, discord_id: str, user: dict[str, Any]) -> None:
+        if self._index is not None:
+            self._index.update(discord_id, user["score"], user["rank"])
 
+    def drop_index(self) -> None:
+        """Rebuild the leaderboard index on next use (after bulk changes)."""
+        self._index = None
 
-def register_user(discord_id: str, github_username: str) -> dict[str, Any]:
-    users = _load_users()
-    users[discord_id] = {
+
+_partitions: dict[int, _Partition] = {guild_id: _Partition(guild_id) for guild_id in GUILD_IDS}
+
+
+def _partition(guild_id: int) -> _Partition:
+    try:
+        return _partitions[guild_id]
+    except KeyError:
+        raise KeyError(f"Guild {guild_id} is not served (GUILD_IDS)") from None
+
+
+@contextmanager
+def _timed(op: str) -> Iterator[None]:
+    with metrics.STORE_LATENCY.time(op=op), tracing.span(f"store.{op}"):
+        yield
+
+
+def load() -> None:
+    """Open every guild's store (otherwise done lazily on first access)."""
+    with _timed("load"):
+        for part in _partitions.values():
+            part.storage.load()
+
+
+def flush() -> bool:
+    """Persist pending changes. Returns True if anything was written."""
+    flushed = False
+    with _timed("flush"):
+        for part in _partitions.values():
+            flushed = part.storage.flush() or flushed
+    return flushed
+
+
+def close() -> None:
+    for part in _partitions.values():
+        part.storage.close()
+
+
+def iter_users(guild_id: int) -> Iterator[tuple[str, dict[str, Any]]]:
+    return _partition(guild_id).storage.iter_users()
+
+
+def get_user(guild_id: int, discord_id: str) -> dict[str, Any] | None:
+    with _timed("get"):
+        return _partition(guild_id).storage.get(discord_id)
+
+
+def register_user(guild_id: int, discord_id: str, github_username: str) -> dict[str, Any]:
+    part = _partition(guild_id)
+    user = {
         "github_username": github_username,
         "rank": "G",
         "score": 0,
     }
-    _save_users(users)
-    return users[discord_id]
+    with part.lock, part.storage.transaction(), _timed("register"):
+        part.storage.put(discord_id, user)
+        part.reindex(discord_id, user)
+        part.history.append(discord_id, 0, 0, "G", "G", flags=history.FLAG_RESET)
+    return user
+
+
+def refresh_index(guild_id: int, discord_id: str) -> None:
+    """Re-read a user changed by another process into the leaderboard index."""
+    part = _partition(guild_id)
+    user = part.storage.get(discord_id)
+    if user:
+        part.reindex(discord_id, user)
+
+
+def find_by_github(guild_id: int, github_username: str) -> tuple[str, dict[str, Any]] | None:
+    with _timed("find"):
+        return _partition(guild_id).storage.find_by_github(github_username)
 
 
-def find_by_github(github_username: str) -> tuple[str, dict[str, Any]] | None:
-    users = _load_users()
-    for did, data in users.items():
-        if data.get("github_username", "").lower() == github_username.lower():
-            return did, data
-    return None
+def locate(
+    github_username: str, guild_id: int | None = None,
+) -> list[tuple[int, str, dict[str, Any]]]:
+    """[(guild_id, discord_id, user)] for each guild where the username is registered.
+
+    With guild_id only that guild is searched.
+    """
+    parts = [_partition(guild_id)] if guild_id is not None else _partitions.values()
+    found = []
+    with _timed("find"):
+        for part in parts:
+            match = part.storage.find_by_github(github_username)
+            if match:
+                found.append((part.guild_id, *match))
+    return found
+
+
+# RANKS is ordered by threshold, so the rank for a score is a bisect away
+_THRESHOLD_SCORES = [RANK_THRESHOLDS[rank] for rank in RANKS]
 
 
 def determine_rank(score: int) -> str:
-    current = "G"
-    for rank in RANKS:
-        if score >= RANK_THRESHOLDS[rank]:
-            current = rank
-    return current
+    i = bisect_right(_THRESHOLD_SCORES, score)
+    return RANKS[i - 1] if i else RANKS[0]
 
 
 def score_for_next_rank(current_rank: str, current_score: int) -> int | None:
@@ -61,13 +154,10 @@ def score_for_next_rank(current_rank: str, current_score: int) -> int | None:
 SKIP_GRADE_THRESHOLD = 70  # Score needed to trigger skip-grade
 
 
-def add_score(
-    discord_id: str, points: int, eval_rank: str | None = None
-) -> tuple[str, str, int]:
-    """Add points, check skip-grade, return (old_rank, new_rank, new_score)."""
-    users = _load_users()
-    user = users[discord_id]
+def _apply_points(user: dict[str, Any], points: int, eval_rank: str | None) -> tuple[str, bool]:
+    """Add points to user in place, check skip-grade, return (old_rank, skipped)."""
     old_rank = user["rank"]
+    skipped = False
 
     user["score"] += points
 
@@ -79,7 +169,161 @@ def add_score(
             threshold = RANK_THRESHOLDS[eval_rank]
             if user["score"] < threshold:
                 user["score"] = threshold + points
+                skipped = True
 
     user["rank"] = determine_rank(user["score"])
-    _save_users(users)
+    return old_rank, skipped
+
+
+def _record(
+    part: _Partition, discord_id: str, user: dict[str, Any], points: int, old_rank: str,
+    eval_rank: str | None, skipped: bool, feedback: str | None,
+) -> None:
+    part.history.append(
+        discord_id, points, user["score"], old_rank, user["rank"], eval_rank, feedback,
+        flags=history.FLAG_SKIP_GRADE if skipped else 0,
+    )
+    if RANKS.index(user["rank"]) > RANKS.index(old_rank):
+        metrics.PROMOTIONS.inc(rank=user["rank"])
+    if skipped:
+        metrics.SKIP_GRADES.inc(rank=user["rank"])
+
+
+def add_score(
+    guild_id: int, discord_id: str, points: int,
+    eval_rank: str | None = None, feedback: str | None = None,
+) -> tuple[str, str, int]:
+    """Add points, check skip-grade, return (old_rank, new_rank, new_score)."""
+    part = _partition(guild_id)
+    with part.lock, part.storage.transaction(), _timed("add_score"):
+        user = part.storage.get(discord_id)
+        if user is None:
+            raise KeyError(discord_id)
+        old_rank, skipped = _apply_points(user, points, eval_rank)
+        part.storage.put(discord_id, user)
+        part.reindex(discord_id, user)
+        _record(part, discord_id, user, points, old_rank, eval_rank, skipped, feedback)
     return old_rank, user["rank"], user["score"]
+
+
+def add_scores(
+    guild_id: int, items: list[tuple[str, int, str | None, str | None]],
+) -> list[tuple[str, str, int]]:
+    """add_score for many (discord_id, points, eval_rank, feedback) items, persisted together.
+
+    Items for the same user are applied in order. All users must exist in the guild.
+    """
+    part = _partition(guild_id)
+    results = []
+    with part.lock, part.storage.transaction(), _timed("add_scores"):
+        users: dict[str, dict[str, Any]] = {}
+        applied = []
+        for discord_id, points, eval_rank, feedback in items:
+            if discord_id not in users:
+                user = part.storage.get(discord_id)
+                if user is None:
+                    raise KeyError(discord_id)
+                users[discord_id] = user
+            user = users[discord_id]
+            old_rank, skipped = _apply_points(user, points, eval_rank)
+            results.append((old_rank, user["rank"], user["score"]))
+            applied.append((discord_id, dict(user), points, old_rank, eval_rank, skipped, feedback))
+        part.storage.put_many(users.items())
+        for event in applied:
+            _record(part, *event)
+        for discord_id, user in users.items():
+            part.reindex(discord_id, user)
+    return results
+
+
+def leaderboard(guild_id: int, offset: int, limit: int) -> list[tuple[int, str, int, str]]:
+    """[(position, discord_id, score, rank)] ordered by score, starting at offset."""
+    return _partition(guild_id).ranking().page(offset, limit)
+
+
+def leaderboard_position(guild_id: int, discord_id: str) -> tuple[int | None, int]:
+    """Return (1-based position or None, total ranked users)."""
+    index = _partition(guild_id).ranking()
+    return index.position(discord_id), len(index)
+
+
+def rank_distribution(guild_id: int) -> dict[str, int]:
+    return _partition(guild_id).ranking().rank_counts()
+
+
+def replay_user(guild_id: int, discord_id: str) -> tuple[str, int] | None:
+    """Recompute (rank, score) from the event history since the last registration."""
+    events = _partition(guild_id).history.events(discord_id)
+    resets = [i for i, e in enumerate(events) if e.reset]
+    if not resets:
+        return None
+    user = {"rank": "G", "score": 0}
+    for event in events[resets[-1] + 1:]:
+        _apply_points(user, event.points, event.eval_rank)
+    return user["rank"], user["score"]
+
+
+def rerank(guild_id: int, dry_run: bool = False) -> list[tuple[str, str, str, int]]:
+    """Recompute every stored rank from the current RANK_THRESHOLDS.
+
+    Returns [(discord_id, old_rank, new_rank, score)] for users whose rank
+    changes. Unless dry_run, the changes are written in one transaction and
+    recorded in the history.
+    """
+    part = _partition(guild_id)
+    changes = []
+    with part.lock, part.storage.transaction(), _timed("rerank"):
+        updated: list[tuple[str, dict[str, Any]]] = []
+        for discord_id, user in part.storage.iter_users():
+            rank = determine_rank(user["score"])
+            if rank != user["rank"]:
+                changes.append((discord_id, user["rank"], rank, user["score"]))
+                updated.append((discord_id, {**user, "rank": rank}))
+        if dry_run:
+            return changes
+        part.storage.put_many(updated)
+        for discord_id, old_rank, new_rank, score in changes:
+            part.history.append(discord_id, 0, score, old_rank, new_rank, flags=history.FLAG_RERANK)
+        for discord_id, user in updated:
+            part.reindex(discord_id, user)
+    logger.info("Re-ranked guild %s: %d rank changes", guild_id, len(changes))
+    return changes
+
+
+def export_users(guild_id: int) -> Iterator[dict[str, Any]]:
+    """Stream the guild's user table as flat records (discord_id + user fields)."""
+    for discord_id, user in _partition(guild_id).storage.iter_users():
+        yield {"discord_id": discord_id, **user}
+
+
+def _import_record(n: int, record: Any) -> tuple[str, dict[str, Any]]:
+    if not isinstance(record, dict):
+        raise ValueError(f"record {n}: expected an object")
+    discord_id = str(record.get("discord_id", ""))
+    github_username = record.get("github_username")
+    score = record.get("score")
+    if not discord_id.isdigit():
+        raise ValueError(f"record {n}: invalid discord_id {discord_id!r}")
+    if not isinstance(github_username, str) or not github_username:
+        raise ValueError(f"record {n}: invalid github_username")
+    if not isinstance(score, int) or isinstance(score, bool):
+        raise ValueError(f"record {n}: invalid score {score!r}")
+    rank = record.get("rank")
+    if rank not in RANKS:
+        rank = determine_rank(score)
+    return discord_id, {"github_username": github_username, "rank": rank, "score": score}
+
+
+def import_users(guild_id: int, records: Iterable[Any]) -> int:
+    """Upsert exported records in one transaction; a bad record aborts the whole import.
+
+    Missing or unknown ranks are derived from the score. Returns the record count.
+    """
+    part = _partition(guild_id)
+    with part.lock, part.storage.transaction(), _timed("import"):
+        count = part.storage.put_many(
+            _import_record(n, record) for n, record in enumerate(records, 1)
+        )
+        part.drop_index()
+    logger.info("Imported %d users into guild %s", count, guild_id)
+    return count
@@ -0,0 +1,294 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
+
+from bot.config import GUILD_ID, GUILDS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class Storage(ABC):
+    """Persistence layer behind bot.services.score.
+
+    User records are plain dicts with ``github_username``, ``rank`` and
+    ``score``; callers always receive copies.
+    """
+
+    @abstractmethod
+    def load(self) -> None: ...
+
+    @abstractmethod
+    def get(self, discord_id: str) -> dict[str, Any] | None: ...
+
+    @abstractmethod
+    def find_by_github(self, github_username: str) -> tuple[str, dict[str, Any]] | None: ...
+
+    @abstractmethod
+    def put(self, discord_id: str, user: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def iter_users(self) -> Iterator[tuple[str, dict[str, Any]]]: ...
+
+    def put_many(self, items: Iterable[tuple[str, dict[str, Any]]]) -> int:
+        count = 0
+        for discord_id, user in items:
+            self.put(discord_id, user)
+            count += 1
+        return count
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Make the enclosed reads and writes atomic for other processes too."""
+        yield
+
+    def flush(self) -> bool:
+        """Persist pending changes. Returns True if anything was written."""
+        return False
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonStorage(Storage):
+    """users.json held in memory and written back as atomic snapshots."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._users: dict[str, dict[str, Any]] | None = None
+        self._github_index: dict[str, set[str]] = {}  # lower-cased username -> discord_ids
+        # discord_id -> order of first insertion; breaks ties between accounts
+        # sharing a username the way SqliteStorage does with its rowid
+        self._seq: dict[str, int] = {}
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def load(self) -> None:
+        self._data()
+
+    def _data(self) -> dict[str, dict[str, Any]]:
+        if self._users is None:
+            with self._lock:
+                if self._users is None:
+                    data: dict[str, Any] = {}
+                    if os.path.exists(self.path):
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                    self._github_index.clear()
+                    self._seq.clear()
+                    for did, user in data.items():
+                        self._index(did, user)
+                    self._users = data
+                    logger.info("Loaded %d users from %s", len(data), self.path)
+        return self._users
+
+    def _index(self, discord_id: str, user: dict[str, Any]) -> None:
+        self._seq.setdefault(discord_id, len(self._seq))
+        name = user.get("github_username", "")
+        if name:
+            self._github_index.setdefault(name.lower(), set()).add(discord_id)
+
+    def get(self, discord_id: str) -> dict[str, Any] | None:
+        user = self._data().get(discord_id)
+        return dict(user) if user else None
+
+    def find_by_github(self, github_username: str) -> tuple[str, dict[str, Any]] | None:
+        users = self._data()
+        with self._lock:
+            ids = self._github_index.get(github_username.lower())
+            if not ids:
+                return None
+            # Most recently registered account wins, as in SqliteStorage
+            did = max(ids, key=self._seq.__getitem__)
+            return did, dict(users[did])
+
+    def put(self, discord_id: str, user: dict[str, Any]) -> None:
+        users = self._data()
+        with self._lock:
+            previous = users.get(discord_id)
+            if previous:
+                old_name = previous.get("github_username", "").lower()
+                ids = self._github_index.get(old_name)
+                if ids is not None:
+                    ids.discard(discord_id)
+                    if not ids:
+                        del self._github_index[old_name]
+            users[discord_id] = dict(user)
+            self._index(discord_id, user)
+            self._dirty = True
+
+    def put_many(self, items: Iterable[tuple[str, dict[str, Any]]]) -> int:
+        # Materialize first so an error while producing items changes nothing
+        items = list(items)
+        with self._lock:
+            return super().put_many(items)
+
+    def iter_users(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        with self._lock:
+            items = [(did, dict(user)) for did, user in self._data().items()]
+        yield from items
+
+    def flush(self) -> bool:
+        with self._lock:
+            if not self._dirty or self._users is None:
+                return False
+            snapshot = {did: dict(user) for did, user in self._users.items()}
+            self._dirty = False
+        try:
+            self._write(snapshot)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def _write(self, data: dict[str, Any]) -> None:
+        """Write a full snapshot atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SqliteStorage(Storage):
+    """One row per user in a WAL-mode SQLite database."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            discord_id      TEXT PRIMARY KEY,
+            github_username TEXT NOT NULL,
+            github_lower    TEXT NOT NULL,
+            rank            TEXT NOT NULL,
+            score           INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS users_github_lower ON users (github_lower);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def load(self) -> None:
+        self._db()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(self._SCHEMA)
+                    self._conn = conn
+                    logger.info("Opened SQLite store %s", self.path)
+        return self._conn
+
+    @staticmethod
+    def _row_to_user(row: tuple) -> dict[str, Any]:
+        return {"github_username": row[0], "rank": row[1], "score": row[2]}
+
+    def get(self, discord_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT github_username, rank, score FROM users WHERE discord_id = ?",
+                (discord_id,),
+            ).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def find_by_github(self, github_username: str) -> tuple[str, dict[str, Any]] | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT github_username, rank, score, discord_id FROM users "
+                "WHERE github_lower = ? ORDER BY rowid DESC LIMIT 1",
+                (github_username.lower(),),
+            ).fetchone()
+        return (row[3], self._row_to_user(row)) if row else None
+
+    def _upsert(self, conn: sqlite3.Connection, discord_id: str, user: dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO users (discord_id, github_username, github_lower, rank, score) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(discord_id) DO UPDATE SET "
+            "github_username = excluded.github_username, github_lower = excluded.github_lower, "
+            "rank = excluded.rank, score = excluded.score",
+            (
+                discord_id,
+                user["github_username"],
+                user["github_username"].lower(),
+                user["rank"],
+                user["score"],
+            ),
+        )
+
+    def put(self, discord_id: str, user: dict[str, Any]) -> None:
+        with self._lock:
+            self._upsert(self._db(), discord_id, user)
+
+    def put_many(self, items: Iterable[tuple[str, dict[str, Any]]]) -> int:
+        count = 0
+        with self.transaction():
+            conn = self._db()
+            for discord_id, user in items:
+                self._upsert(conn, discord_id, user)
+                count += 1
+        return count
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write
+        # cycles from several API worker processes can't interleave
+        with self._lock:
+            conn = self._db()
+            if conn.in_transaction:
+                yield
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def iter_users(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        with self._lock:
+            cursor = self._db().execute(
+                "SELECT github_username, rank, score, discord_id FROM users"
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(500)
+            if not rows:
+                break
+            for row in rows:
+                yield row[3], self._row_to_user(row)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def guild_path(path: str, guild_id: int) -> str:
+    """Where a guild's copy of a data file lives; the default guild keeps the original path."""
+    if guild_id == GUILD_ID:
+        return path
+    return os.path.join(GUILDS_DIR, str(guild_id), os.path.basename(path))
+
+
+def open_storage(backend: str, json_path: str, sqlite_path: str) -> Storage:
+    if backend == "json":
+        return JsonStorage(json_path)
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_path)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r}")
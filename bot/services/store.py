@@ -0,0 +1,117 @@
+"""Async facade over bot.services.score for use on the event loop.
+
+Blocking store I/O runs in a worker thread, and mutations are serialized
+per (guild, Discord ID) so concurrent evaluations for one user can't lose
+updates while different users proceed in parallel.
+"""
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Hashable
+
+from bot.services import history as history_service, score as score_service, tracing
+from bot.services.history import ScoreEvent
+
+
+class KeyedLock:
+    """asyncio locks created on demand per key and dropped once unused."""
+
+    def __init__(self) -> None:
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._holders: dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            with tracing.span("store.lock_wait"):
+                await lock.acquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._holders[key] -= 1
+            if not self._holders[key]:
+                del self._holders[key]
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+user_lock = KeyedLock()
+
+
+async def get_user(guild_id: int, discord_id: str) -> dict[str, Any] | None:
+    return await asyncio.to_thread(score_service.get_user, guild_id, discord_id)
+
+
+async def find_by_github(guild_id: int, github_username: str) -> tuple[str, dict[str, Any]] | None:
+    return await asyncio.to_thread(score_service.find_by_github, guild_id, github_username)
+
+
+async def locate_many(
+    lookups: list[tuple[str, int | None]],
+) -> list[list[tuple[int, str, dict[str, Any]]]]:
+    """score.locate for many (github_username, guild_id or None) pairs in one thread hop."""
+    return await asyncio.to_thread(
+        lambda: [score_service.locate(name, guild_id) for name, guild_id in lookups]
+    )
+
+
+async def register_user(guild_id: int, discord_id: str, github_username: str) -> dict[str, Any]:
+    async with user_lock((guild_id, discord_id)):
+        return await asyncio.to_thread(
+            score_service.register_user, guild_id, discord_id, github_username
+        )
+
+
+async def add_score(
+    guild_id: int, discord_id: str, points: int,
+    eval_rank: str | None = None, feedback: str | None = None,
+) -> tuple[str, str, int]:
+    async with user_lock((guild_id, discord_id)):
+        return await asyncio.to_thread(
+            score_service.add_score, guild_id, discord_id, points, eval_rank, feedback
+        )
+
+
+async def add_scores(
+    guild_id: int, items: list[tuple[str, int, str | None, str | None]],
+) -> list[tuple[str, str, int]]:
+    async with AsyncExitStack() as stack:
+        # Fixed acquisition order so overlapping batches can't deadlock
+        for discord_id in sorted({item[0] for item in items}):
+            await stack.enter_async_context(user_lock((guild_id, discord_id)))
+        return await asyncio.to_thread(score_service.add_scores, guild_id, items)
+
+
+async def leaderboard(guild_id: int, offset: int, limit: int) -> list[tuple[int, str, int, str]]:
+    return await asyncio.to_thread(score_service.leaderboard, guild_id, offset, limit)
+
+
+async def leaderboard_position(guild_id: int, discord_id: str) -> tuple[int | None, int]:
+    return await asyncio.to_thread(score_service.leaderboard_position, guild_id, discord_id)
+
+
+async def rank_distribution(guild_id: int) -> dict[str, int]:
+    return await asyncio.to_thread(score_service.rank_distribution, guild_id)
+
+
+async def history(guild_id: int, discord_id: str, limit: int) -> list[ScoreEvent]:
+    return await asyncio.to_thread(history_service.for_guild(guild_id).recent, discord_id, limit)
+
+
+async def history_feedback(guild_id: int, event: ScoreEvent) -> str | None:
+    return await asyncio.to_thread(history_service.for_guild(guild_id).feedback, event)
+
+
+def _feedback_event(guild_id: int, discord_id: str, n: int) -> tuple[ScoreEvent | None, int]:
+    with_feedback = [e for e in history_service.for_guild(guild_id).events(discord_id) if e.feedback_length]
+    return (with_feedback[-n] if 0 < n <= len(with_feedback) else None), len(with_feedback)
+
+
+async def feedback_event(guild_id: int, discord_id: str, n: int) -> tuple[ScoreEvent | None, int]:
+    """The user's n-th newest evaluation with feedback (1 = latest) and how many there are."""
+    return await asyncio.to_thread(_feedback_event, guild_id, discord_id, n)
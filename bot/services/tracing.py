@@ -0,0 +1,155 @@
+"""Request-scoped timing spans.
+
+A trace is opened per webhook request, slash command and background job
+(with trace(), or begin()/end() where no single frame spans the work);
+code below it opens named spans, which nest through a contextvar (so they
+follow awaits, asyncio.to_thread and tasks created inside the trace).
+Spans opened outside any trace cost almost nothing and record nothing.
+
+When a trace ends, every span's duration goes to git_eval_span_seconds,
+the per-name totals are logged at DEBUG as one JSON line, and traces
+slower than TRACE_SLOW_SECONDS log their whole span tree as a warning.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from bot.config import TRACE_SLOW_SECONDS
+from bot.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Span:
+    name: str
+    attrs: dict[str, Any]
+    start: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+    error: str | None = None
+    children: list["Span"] = field(default_factory=list)
+
+    def walk(self, depth: int = 0) -> Iterator[tuple[int, "Span"]]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def breakdown(self) -> dict[str, float]:
+        """Total seconds per span name below this span."""
+        totals: dict[str, float] = {}
+        for depth, span in self.walk():
+            if depth and span.duration is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def render(self) -> str:
+        lines = []
+        for depth, span in self.walk():
+            ms = f"{span.duration * 1000:8.1f} ms" if span.duration is not None else "   (open)  "
+            offset = (span.start - self.start) * 1000
+            attrs = " ".join(f"{k}={v}" for k, v in span.attrs.items())
+            error = f" !{span.error}" if span.error else ""
+            lines.append(f"{ms} +{offset:7.1f} {'  ' * depth}{span.name} {attrs}{error}".rstrip())
+        return "\n".join(lines)
+
+
+_current: ContextVar[Span | None] = ContextVar("git_eval_span", default=None)
+
+
+def current() -> Span | None:
+    """The innermost open span. Tasks outliving their trace (timers, queued
+    work) inherit its context, so a span that has already ended counts as none."""
+    span = _current.get()
+    return span if span is not None and span.duration is None else None
+
+
+@contextmanager
+def _enter(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - span.start
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    """Time a step of the current trace (no-op outside a trace)."""
+    parent = current()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    with _enter(child):
+        yield child
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Span]:
+    """Open a trace, or a span if one is already open."""
+    if current() is not None:
+        with span(name, **attrs) as child:
+            yield child
+        return
+    root = Span(name, attrs)
+    try:
+        with _enter(root):
+            yield root
+    finally:
+        _finish(root)
+
+
+def begin(name: str, **attrs: Any) -> Span:
+    """Open a trace that outlives the calling frame; the rest of the current
+    task runs inside it. Close it with end()."""
+    root = Span(name, attrs)
+    _current.set(root)
+    return root
+
+
+def end(root: Span, error: BaseException | None = None) -> None:
+    """Close a trace opened with begin(); later calls do nothing."""
+    if root.duration is not None:
+        return
+    if error is not None:
+        root.error = type(error).__name__
+    root.duration = time.perf_counter() - root.start
+    _finish(root)
+
+
+def _finish(root: Span) -> None:
+    for _, s in root.walk():
+        if s.duration is not None:
+            metrics.SPAN_LATENCY.observe(s.duration, span=s.name)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({
+            "trace": root.name,
+            **root.attrs,
+            "ms": round(root.duration * 1000, 2),
+            "error": root.error,
+            "spans": {name: round(sec * 1000, 2) for name, sec in root.breakdown().items()},
+        }, default=str))
+    if TRACE_SLOW_SECONDS and root.duration >= TRACE_SLOW_SECONDS:
+        logger.warning("Slow %s (%.0f ms):\n%s", root.name, root.duration * 1000, root.render())
+
+
+def server_timing(root: Span) -> str:
+    """Server-Timing header value: the total, plus the per-name breakdown
+    only while this logger is at DEBUG (it reveals internals to any caller)."""
+    total = root.duration if root.duration is not None else time.perf_counter() - root.start
+    parts = [f"total;dur={total * 1000:.1f}"]
+    if logger.isEnabledFor(logging.DEBUG):
+        parts.extend(
+            f"{name.replace(' ', '_').replace('/', '.')};dur={sec * 1000:.1f}"
+            for name, sec in root.breakdown().items()
+        )
+    return ", ".join(parts)
@@ -1,7 +1,53 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 
+from bot.config import SHARD_COUNT
+from bot.services import tracing
+
 intents = discord.Intents.default()
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+class TracedCommandTree(app_commands.CommandTree):
+    """Runs each slash command inside its own trace (see bot.services.tracing).
+
+    interaction_check runs in the command's task right before the command,
+    so the trace opened there encloses it. It ends in on_error or, for
+    commands that succeed, on the app_command_completion event.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction, /) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            name = (interaction.data or {}).get("name", "?")
+            interaction.extras["trace"] = tracing.begin(
+                f"/{name}", guild=interaction.guild_id, user=interaction.user.id
+            )
+        return True
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError, /
+    ) -> None:
+        _end_command_trace(interaction, error)
+        await super().on_error(interaction, error)
+
+
+def _end_command_trace(interaction: discord.Interaction, error: Exception | None = None) -> None:
+    root = interaction.extras.pop("trace", None)
+    if root is not None:
+        tracing.end(root, error)
+
+
+# One gateway connection per shard, all in this process
+bot = commands.AutoShardedBot(
+    command_prefix="!", intents=intents, shard_count=SHARD_COUNT or None, tree_cls=TracedCommandTree,
+)
+
+
+async def on_app_command_completion(
+    interaction: discord.Interaction, command: app_commands.Command | app_commands.ContextMenu
+) -> None:
+    _end_command_trace(interaction)
+
+
+bot.add_listener(on_app_command_completion)
@@ -0,0 +1,81 @@
+"""Offline maintenance of the user table. Run with the bot stopped.
+
+Usage:
+  python manage_users.py rerank [--guild ID] [--dry-run]
+  python manage_users.py export [--guild ID] [-o users.jsonl]
+  python manage_users.py import users.jsonl [--guild ID] [--rerank]
+
+rerank recomputes every rank from RANK_THRESHOLDS; Discord roles catch up
+through the role reconciliation the bot runs on startup (or /rerank from
+Discord does both at once). export/import stream one JSON object per
+line; "-" means stdout/stdin. An import is all-or-nothing.
+"""
+import argparse
+import json
+import sys
+
+from bot.config import GUILD_ID
+from bot.services import history, score as score_service
+
+
+def _rerank(args: argparse.Namespace) -> None:
+    changes = score_service.rerank(args.guild, dry_run=args.dry_run)
+    for discord_id, old_rank, new_rank, score in changes:
+        print(f"{discord_id}: {old_rank} -> {new_rank} ({score} pt)")
+    verb = "Would change" if args.dry_run else "Changed"
+    print(f"{verb} {len(changes)} ranks in guild {args.guild}.", file=sys.stderr)
+
+
+def _export(args: argparse.Namespace) -> None:
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    with out:
+        for record in score_service.export_users(args.guild):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    print(f"Exported {count} users from guild {args.guild}.", file=sys.stderr)
+
+
+def _import(args: argparse.Namespace) -> None:
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    with src:
+        records = (json.loads(line) for line in src if line.strip())
+        count = score_service.import_users(args.guild, records)
+    print(f"Imported {count} users into guild {args.guild}.", file=sys.stderr)
+    if args.rerank:
+        _rerank(argparse.Namespace(guild=args.guild, dry_run=False))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--guild", type=int, default=GUILD_ID, help="guild ID (default: the default guild)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rerank = commands.add_parser("rerank", parents=[common], help="recompute ranks from RANK_THRESHOLDS")
+    rerank.add_argument("--dry-run", action="store_true", help="list changes without saving")
+    rerank.set_defaults(run=_rerank)
+
+    export = commands.add_parser("export", parents=[common], help="write the user table as JSONL")
+    export.add_argument("-o", "--output", default="-")
+    export.set_defaults(run=_export)
+
+    import_ = commands.add_parser("import", parents=[common], help="upsert users from JSONL")
+    import_.add_argument("input")
+    import_.add_argument("--rerank", action="store_true", help="re-rank after importing")
+    import_.set_defaults(run=_import)
+
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        score_service.close()
+        history.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
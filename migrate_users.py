@@ -0,0 +1,30 @@
+"""Run once to import users.json into the SQLite store, then exit.
+
+Usage: python migrate_users.py [users.json] [users.db]
+Without arguments every guild in GUILD_IDS that has a users.json is imported.
+Existing rows with the same Discord ID are overwritten.
+"""
+import os
+import sys
+
+from bot.config import GUILD_IDS, USERS_FILE, SQLITE_FILE
+from bot.services.storage import JsonStorage, SqliteStorage, guild_path
+
+if len(sys.argv) > 1:
+    pairs = [(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else SQLITE_FILE)]
+else:
+    pairs = [
+        (guild_path(USERS_FILE, guild_id), guild_path(SQLITE_FILE, guild_id))
+        for guild_id in GUILD_IDS
+        if os.path.exists(guild_path(USERS_FILE, guild_id))
+    ]
+
+for src_path, dst_path in pairs:
+    src = JsonStorage(src_path)
+    dst = SqliteStorage(dst_path)
+
+    print(f"Importing {src_path} -> {dst_path}")
+    count = dst.put_many(src.iter_users())
+    dst.close()
+    print(f"Imported {count} users.")
+print("Set STORAGE_BACKEND=sqlite to use it.")
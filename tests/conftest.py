@@ -0,0 +1,8 @@
+"""bot.config reads these at import time; no Discord connection is made."""
+import os
+import tempfile
+
+os.environ.setdefault("DISCORD_TOKEN", "test")
+os.environ.setdefault("GUILD_ID", "1")
+os.environ.setdefault("WEBHOOK_SECRET", "test")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="git-eval-test-"))
@@ -0,0 +1,98 @@
+"""Debounce windows and delivery dedup: nothing provisional is ever replayed."""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from bot.api import webhook
+from bot.services import debounce, dedup
+
+GUILD_ID = 1
+KEY = "id:delivery-1"
+
+
+@pytest.fixture
+def window(monkeypatch):
+    """A short debounce window in front of a recording score store."""
+    applied: list[tuple[str, int]] = []
+
+    async def add_score(guild_id, discord_id, points, eval_rank=None, feedback=None):
+        applied.append((discord_id, points))
+        return "E", "E", sum(p for _, p in applied)
+
+    async def apply_eval_effects(*args):
+        return False, None
+
+    monkeypatch.setattr(debounce, "EVAL_DEBOUNCE_SECONDS", 0.05)
+    monkeypatch.setattr(debounce.store, "add_score", add_score)
+    monkeypatch.setattr(debounce, "apply_eval_effects", apply_eval_effects)
+    monkeypatch.setattr(debounce, "_pending", {})
+    monkeypatch.setattr(dedup, "_entries", OrderedDict())
+    return applied
+
+
+def _deliver(key: str, score: int = 10):
+    """What receive_eval does with a debounced evaluation."""
+    async def handler():
+        pending = debounce.submit(GUILD_ID, "100", "octocat", score, "ok", None, key)
+        return 202, {"status": "pending", "coalesced": pending.count}
+
+    return dedup.run_once(key, handler, record=webhook._settled)
+
+
+def test_pending_response_is_not_recorded(window):
+    async def scenario():
+        (status, body), replayed = await _deliver(KEY)
+        assert (status, body["status"], replayed) == (202, "pending", False)
+        assert dedup.get(KEY) is None
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert window == [("100", 10)]
+    status, body = dedup.get(KEY)
+    assert (status, body["status"], body["score"], body["coalesced"]) == (200, "ok", 10, 1)
+
+
+def test_window_lost_in_a_crash_is_applied_on_retry(window):
+    async def scenario():
+        await _deliver(KEY)
+        # Crash: the in-memory window is gone without being applied
+        for pending in debounce._pending.values():
+            pending.timer.cancel()
+        debounce._pending.clear()
+
+        (status, body), replayed = await _deliver(KEY)
+        assert (body["status"], replayed) == ("pending", False)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert window == [("100", 10)]
+
+
+def test_retry_inside_the_window_is_not_merged_again(window):
+    async def scenario():
+        await _deliver(KEY, 10)
+        (_, body), _ = await _deliver(KEY, 10)
+        assert body["coalesced"] == 1
+        (_, body), _ = await _deliver("id:delivery-2", 20)
+        assert body["coalesced"] == 2
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert window == [("100", 20)]  # one application, latest score
+    assert dedup.get(KEY) == dedup.get("id:delivery-2")
+    assert dedup.get(KEY)[1]["coalesced"] == 2
+
+
+def test_settled_responses_are_replayed(window):
+    async def handler():
+        return 200, {"status": "ok"}
+
+    async def scenario():
+        first = await dedup.run_once(KEY, handler, record=webhook._settled)
+        second = await dedup.run_once(KEY, handler, record=webhook._settled)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ((200, {"status": "ok"}), False)
+    assert second == ((200, {"status": "ok"}), True)
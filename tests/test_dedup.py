@@ -0,0 +1,97 @@
+"""Delivery dedup: replay, concurrent duplicates, and flush ordering."""
+import asyncio
+import json
+from collections import OrderedDict
+
+import pytest
+
+from bot.services import dedup
+
+
+@pytest.fixture(autouse=True)
+def deliveries(monkeypatch, tmp_path):
+    path = tmp_path / "deliveries.json"
+    monkeypatch.setattr(dedup, "DELIVERIES_FILE", str(path))
+    monkeypatch.setattr(dedup, "_entries", OrderedDict())
+    monkeypatch.setattr(dedup, "_dirty", False)
+    return path
+
+
+def test_second_delivery_is_replayed():
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return 200, {"n": len(calls)}
+
+    async def scenario():
+        return [await dedup.run_once("id:1", handler) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [((200, {"n": 1}), False), ((200, {"n": 1}), True)]
+    assert calls == [1]
+
+
+def test_concurrent_duplicates_share_one_run():
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 200, {}
+
+    async def scenario():
+        return await asyncio.gather(*(dedup.run_once("id:1", handler) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert [replayed for _, replayed in results] == [False, True, True]
+
+
+def test_failures_are_not_cached():
+    attempts = []
+
+    async def handler():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("store down")
+        return 200, {}
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await dedup.run_once("id:1", handler)
+        return await dedup.run_once("id:1", handler)
+
+    assert asyncio.run(scenario()) == ((200, {}), False)
+
+
+def test_expired_entries_are_not_replayed(monkeypatch):
+    dedup.put("id:1", 200, {})
+    monkeypatch.setattr(dedup.time, "time", lambda: 10 ** 12)
+    assert dedup.get("id:1") is None
+
+
+def test_flush_writes_entries_captured_before_the_score_flush(deliveries):
+    dedup.put("id:1", 200, {})
+
+    def score_flush():
+        # A delivery finishing while the scores are written isn't persisted
+        # with them; it waits for the next flush
+        dedup.put("id:2", 200, {})
+
+    assert dedup.flush(before_write=score_flush)
+    assert set(json.loads(deliveries.read_text())) == {"id:1"}
+    assert dedup.flush()
+    assert set(json.loads(deliveries.read_text())) == {"id:1", "id:2"}
+
+
+def test_failed_score_flush_persists_no_entries(deliveries):
+    dedup.put("id:1", 200, {})
+
+    def score_flush():
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        dedup.flush(before_write=score_flush)
+    assert not deliveries.exists()
+    assert dedup.flush()  # still dirty, written next time
+    assert set(json.loads(deliveries.read_text())) == {"id:1"}
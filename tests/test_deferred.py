@@ -0,0 +1,107 @@
+"""Effects are held while a guild's shard reconnects and replayed once it is back.
+
+Run with `python -m pytest tests`; no Discord connection is made.
+"""
+import asyncio
+
+import pytest
+
+from bot.services import deferred, effects, members, scheduler
+from bot.state import bot
+
+GUILD_ID = 1
+
+
+class FakeShard:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+
+class FakeGuild:
+    id = GUILD_ID
+    name = "test-guild"
+    shard_id = 0
+
+    def __init__(self):
+        self.unavailable = False
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """A ready bot with one guild on one open shard; role edits and DMs are recorded."""
+    guild, shard = FakeGuild(), FakeShard()
+    roles: list[tuple[str, str]] = []
+
+    async def set_rank_role(guild, member, rank):
+        roles.append((member, rank))
+
+    async def send_dm(member, **kwargs):
+        pass
+
+    async def resolve(guild, member_id):
+        return str(member_id)
+
+    async def announce(guild, member, rank):
+        pass
+
+    monkeypatch.setattr(bot, "is_ready", lambda: True, raising=False)
+    monkeypatch.setattr(bot, "get_guild", lambda guild_id: guild if guild_id == GUILD_ID else None)
+    monkeypatch.setattr(bot, "get_shard", lambda shard_id: shard)
+    monkeypatch.setattr(scheduler, "set_rank_role", set_rank_role)
+    monkeypatch.setattr(scheduler, "send_dm", send_dm)
+    monkeypatch.setattr(members, "resolve", resolve)
+    monkeypatch.setattr(effects, "send_promotion_notification", announce)
+    monkeypatch.setattr(deferred, "_entries", None)
+    deferred.load()
+    return guild, shard, roles
+
+
+def _apply(discord_id: str, new_rank: str = "E"):
+    return asyncio.run(effects.apply_eval_effects(GUILD_ID, discord_id, "E", new_rank, 10, 10, "ok"))
+
+
+def test_applies_while_connected(gateway):
+    _, _, roles = gateway
+    assert _apply("100") == (False, None)
+    assert roles == [("100", "E")]
+    assert deferred.depth() == 0
+
+
+def test_held_while_shard_reconnects_and_replayed_after(gateway):
+    _, shard, roles = gateway
+    shard.closed = True  # bot.is_ready() stays True through the reconnect
+
+    assert _apply("100", "D") == (False, effects.DEFERRED)
+    assert roles == []
+    assert deferred.depth() == 1
+
+    # A drain while the shard is still down leaves the effects held
+    assert asyncio.run(deferred.drain()) == 0
+    assert deferred.depth() == 1
+
+    shard.closed = False
+    assert asyncio.run(deferred.drain()) == 1
+    assert roles == [("100", "D")]
+    assert deferred.depth() == 0
+
+
+def test_held_while_guild_unavailable(gateway):
+    guild, _, roles = gateway
+    guild.unavailable = True
+    assert _apply("100") == (False, effects.DEFERRED)
+
+    guild.unavailable = False
+    assert asyncio.run(deferred.drain()) == 1
+    assert roles == [("100", "E")]
+
+
+def test_held_while_guild_not_cached(gateway, monkeypatch):
+    _, _, roles = gateway
+    monkeypatch.setattr(bot, "get_guild", lambda guild_id: None)
+    assert _apply("100") == (False, effects.DEFERRED)
+    assert asyncio.run(deferred.drain()) == 0
+    assert roles == []
+    assert deferred.depth() == 1
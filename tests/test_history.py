@@ -0,0 +1,62 @@
+"""The event log round-trips records and feedback, and survives a reopen."""
+from bot.services.feedback_archive import FeedbackArchive
+from bot.services.history import FLAG_RESET, EventLog
+
+
+def _log(tmp_path, archive: bool = True) -> EventLog:
+    return EventLog(
+        str(tmp_path / "history.bin"), str(tmp_path / "history_feedback.bin"),
+        FeedbackArchive(str(tmp_path / "feedback"), 1 << 20) if archive else None,
+    )
+
+
+def _fill(log: EventLog) -> None:
+    log.append("10", 0, 0, "E", "E", flags=FLAG_RESET)
+    log.append("10", 40, 40, "E", "D", eval_rank="D", feedback="good\nwork")
+    log.append("11", 5, 5, "E", "E", feedback="ok")
+    log.append("10", 3, 43, "D", "D")
+
+
+def test_round_trip(tmp_path):
+    log = _log(tmp_path)
+    _fill(log)
+    events = log.events("10")
+    assert [(e.points, e.score, e.old_rank, e.new_rank) for e in events] == [
+        (0, 0, "E", "E"), (40, 40, "E", "D"), (3, 43, "D", "D"),
+    ]
+    assert events[0].reset and not events[1].reset
+    assert events[1].eval_rank == "D" and events[2].eval_rank is None
+    assert [log.feedback(e) for e in events] == ["", "good\nwork", ""]
+    assert [e.score for e in log.recent("10", 2)] == [43, 40]
+
+
+def test_reopen_rebuilds_index(tmp_path):
+    log = _log(tmp_path)
+    _fill(log)
+    log.flush()
+
+    reopened = _log(tmp_path)
+    assert [e.score for e in reopened.events("10")] == [0, 40, 43]
+    [event] = reopened.events("11")
+    assert reopened.feedback(event) == "ok"
+
+
+def test_feedback_without_archive_goes_to_the_legacy_file(tmp_path):
+    log = _log(tmp_path, archive=False)
+    _fill(log)
+    events = log.events("10")
+    assert not events[1].archived
+    assert log.feedback(events[1]) == "good\nwork"
+
+
+def test_torn_record_is_dropped(tmp_path):
+    log = _log(tmp_path)
+    _fill(log)
+    log.flush()
+    with open(tmp_path / "history.bin", "ab") as f:
+        f.write(b"\0" * 7)  # crash mid-write
+
+    reopened = _log(tmp_path)
+    assert len(reopened.events("10")) == 3
+    reopened.append("10", 1, 44, "D", "D")
+    assert [e.score for e in reopened.recent("10", 1)] == [44]
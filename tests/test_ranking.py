@@ -0,0 +1,39 @@
+"""ScoreIndex keeps standings, pages and per-rank counts in step with updates."""
+from bot.services.ranking import ScoreIndex
+
+
+def _index() -> ScoreIndex:
+    return ScoreIndex([("a", 30, "D"), ("b", 50, "C"), ("c", 30, "D"), ("d", 10, "E")])
+
+
+def test_positions_share_ties():
+    index = _index()
+    assert [index.position(did) for did in "bacd"] == [1, 2, 2, 4]
+    assert index.position("missing") is None
+
+
+def test_page_is_ordered_and_offset():
+    index = _index()
+    assert index.page(0, 2) == [(1, "b", 50, "C"), (2, "a", 30, "D")]
+    assert index.page(2, 10) == [(2, "c", 30, "D"), (4, "d", 10, "E")]
+    assert index.page(10, 5) == []
+
+
+def test_update_moves_user_and_counts():
+    index = _index()
+    index.update("d", 60, "B")
+    assert index.position("d") == 1
+    assert index.position("b") == 2
+    assert index.rank_counts() == {"B": 1, "C": 1, "D": 2}
+    index.update("e", 30, "D")  # new user joins a tie
+    assert [index.position(did) for did in "ace"] == [3, 3, 3]
+    assert len(index) == 5
+
+
+def test_remove():
+    index = _index()
+    index.remove("b")
+    index.remove("missing")
+    assert index.position("a") == 1
+    assert index.rank_counts() == {"D": 2, "E": 1}
+    assert len(index) == 3
@@ -0,0 +1,41 @@
+"""Token buckets per key."""
+import pytest
+
+from bot.services import ratelimit
+from bot.services.ratelimit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait(clock):
+    limiter = RateLimiter(rate=2, burst=3)
+    assert [limiter.take("ip") for _ in range(3)] == [0, 0, 0]
+    assert limiter.take("ip") == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert limiter.take("ip") == 0
+
+
+def test_keys_are_independent(clock):
+    limiter = RateLimiter(rate=1, burst=1)
+    assert limiter.take("a") == 0
+    assert limiter.take("a") > 0
+    assert limiter.take("b") == 0
+
+
+def test_zero_rate_disables(clock):
+    limiter = RateLimiter(rate=0, burst=1)
+    assert all(limiter.take("ip") == 0 for _ in range(100))
+    assert len(limiter) == 0
+
+
+def test_least_recently_used_keys_are_forgotten(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.take(key)
+    assert len(limiter) == 2
+    assert limiter.take("a") == 0  # forgotten, so refilled
@@ -0,0 +1,40 @@
+"""Rank role changes touch only the rank roles."""
+import asyncio
+
+from bench.fake_discord import FakeConfig, FakeGuild, FakeRole
+from bot.services import role
+
+
+class RecordingMember:
+    """A (possibly stale) member copy; has no edit(), so replacing the role list fails."""
+
+    def __init__(self, roles: list[FakeRole]):
+        self.id = 1
+        self.roles = roles
+        self.added: list[str] = []
+        self.removed: list[str] = []
+
+    async def add_roles(self, *roles, reason=None):
+        self.added += [r.name for r in roles]
+
+    async def remove_roles(self, *roles, reason=None):
+        self.removed += [r.name for r in roles]
+
+
+def _setup(rank: str) -> tuple[FakeGuild, RecordingMember]:
+    guild = FakeGuild(42, 43, FakeConfig(latency=0, jitter=0))
+    rank_role = next(r for r in guild.roles if r.name == role._role_name(rank))
+    return guild, RecordingMember([guild.default_role, FakeRole(999, "Moderator"), rank_role])
+
+
+def test_rank_change_adds_and_removes_only_rank_roles():
+    guild, member = _setup("G")
+    asyncio.run(role.set_rank_role(guild, member, "F"))
+    assert member.added == [role._role_name("F")]
+    assert member.removed == [role._role_name("G")]
+
+
+def test_same_rank_makes_no_request():
+    guild, member = _setup("G")
+    asyncio.run(role.set_rank_role(guild, member, "G"))
+    assert member.added == member.removed == []
@@ -0,0 +1,62 @@
+"""Both storage backends resolve GitHub usernames the same way."""
+import pytest
+
+from bot.services.storage import JsonStorage, SqliteStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        store = JsonStorage(str(tmp_path / "users.json"))
+    else:
+        store = SqliteStorage(str(tmp_path / "users.db"))
+    store.load()
+    yield store
+    store.close()
+
+
+def _user(name: str, score: int = 0) -> dict:
+    return {"github_username": name, "rank": "E", "score": score}
+
+
+def test_find_is_case_insensitive(storage):
+    storage.put("10", _user("Foo", 5))
+    assert storage.find_by_github("foo") == ("10", _user("Foo", 5))
+    assert storage.find_by_github("FOO") == ("10", _user("Foo", 5))
+    assert storage.find_by_github("bar") is None
+
+
+def test_rename_moves_the_lookup(storage):
+    storage.put("10", _user("foo"))
+    storage.put("10", _user("bar"))
+    assert storage.find_by_github("foo") is None
+    assert storage.find_by_github("bar")[0] == "10"
+
+
+def test_shared_name_survives_other_account_leaving_it(storage):
+    storage.put("10", _user("foo"))
+    storage.put("11", _user("foo"))
+    assert storage.find_by_github("foo")[0] == "11"  # most recently registered
+    storage.put("11", _user("bar"))
+    assert storage.find_by_github("foo")[0] == "10"
+    assert storage.find_by_github("bar")[0] == "11"
+
+
+def test_tie_break_ignores_updates(storage):
+    storage.put("10", _user("foo"))
+    storage.put("11", _user("foo"))
+    storage.put("10", _user("foo", 99))  # a score update doesn't re-register
+    assert storage.find_by_github("foo")[0] == "11"
+
+
+def test_index_rebuilt_on_load(tmp_path):
+    path = str(tmp_path / "users.json")
+    store = JsonStorage(path)
+    store.put("10", _user("foo"))
+    store.put("11", _user("foo"))
+    store.put("12", _user("Bar"))
+    store.flush()
+
+    reloaded = JsonStorage(path)
+    assert reloaded.find_by_github("foo")[0] == "11"
+    assert reloaded.find_by_github("bar")[0] == "12"
@@ -0,0 +1,76 @@
+"""Traces, spans, and the slash-command trace opened by the command tree."""
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import discord
+
+from bot.services import metrics, tracing
+from bot.state import bot
+
+
+def _span_count(name: str) -> int:
+    series = metrics.SPAN_LATENCY._series.get((name,))
+    return series[2] if series else 0
+
+
+def test_spans_nest_and_are_recorded():
+    with tracing.trace("job") as root:
+        with tracing.span("step", n=1):
+            with tracing.span("inner"):
+                pass
+    names = [(depth, span.name) for depth, span in root.walk()]
+    assert names == [(0, "job"), (1, "step"), (2, "inner")]
+    assert tracing.current() is None
+
+
+def test_spans_outside_a_trace_are_noops():
+    with tracing.span("orphan") as span:
+        assert span is None
+
+
+def test_server_timing_hides_the_breakdown_unless_debugging(caplog):
+    with tracing.trace("POST /webhook/eval") as root:
+        with tracing.span("store.add_score"):
+            pass
+    assert tracing.server_timing(root).count(";dur=") == 1
+    with caplog.at_level(logging.DEBUG, logger=tracing.__name__):
+        assert "store.add_score;dur=" in tracing.server_timing(root)
+
+
+def _interaction(name: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        type=discord.InteractionType.application_command, data={"name": name},
+        guild_id=1, user=SimpleNamespace(id=2), extras={}, command=None,
+    )
+
+
+def test_command_trace_encloses_the_command_and_ends_on_completion():
+    from bot.state import on_app_command_completion
+
+    interaction = _interaction("rank")
+    before = _span_count("db")
+
+    async def command_task():
+        assert await bot.tree.interaction_check(interaction)
+        with tracing.span("db"):
+            pass
+        await on_app_command_completion(interaction, None)
+
+    asyncio.run(command_task())
+    assert _span_count("db") == before + 1
+    assert "trace" not in interaction.extras
+
+
+def test_command_trace_records_the_error():
+    interaction = _interaction("register")
+
+    async def command_task():
+        await bot.tree.interaction_check(interaction)
+        root = interaction.extras["trace"]
+        await bot.tree.on_error(interaction, discord.app_commands.AppCommandError("boom"))
+        return root
+
+    root = asyncio.run(command_task())
+    assert root.error == "AppCommandError"
+    assert root.duration is not None